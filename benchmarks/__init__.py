@@ -0,0 +1 @@
+"""Benchmarks and local tooling for measuring the Iris frontend"""
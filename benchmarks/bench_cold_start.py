@@ -0,0 +1,108 @@
+"""Measure time to first response after gunicorn starts
+
+For each startup configuration, starts a single gunicorn worker against
+the stub API and reports how long it took to answer at all, then the
+latency of the first user's login and first page views next to the same
+pages once warm. Configurations:
+
+    cold      no template bytecode cache, no warm-up
+    bytecode  templates precompiled with `python -m iris.warmup`
+    warm_up   bytecode plus WARM_UP=true
+    preload   warm_up plus GUNICORN_PRELOAD=true
+
+    python -m benchmarks.bench_cold_start --rounds 5
+"""
+from .loadgen import login
+from .servers import ROOT, start_gunicorn, start_stub, stop
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+CONFIGS = {
+    "cold": {"TEMPLATE_CACHE": "false", "WARM_UP": "false"},
+    "bytecode": {"TEMPLATE_CACHE": "true", "WARM_UP": "false"},
+    "warm_up": {"TEMPLATE_CACHE": "true", "WARM_UP": "true"},
+    "preload": {"TEMPLATE_CACHE": "true", "WARM_UP": "true", "GUNICORN_PRELOAD": "true"},
+}
+
+PAGES = ["/standup/dashboard", "/standup/1", "/standup/sessions/1"]
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            requests.get(url, timeout=1, allow_redirects=False)
+            return
+        except requests.RequestException:
+            time.sleep(0.005)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def timed_get(client, url):
+    start = time.perf_counter()
+    client.get(url, allow_redirects=False).raise_for_status()
+    return (time.perf_counter() - start) * 1000
+
+
+def measure(api_url, env):
+    """Start one worker and time its first responses, in ms"""
+    start = time.perf_counter()
+    app, url = start_gunicorn(api_url, workers=1, env=env, args=["--config", "gunicorn.conf.py"], wait=False)
+    try:
+        wait_until_up(f"{url}/login")
+        result = {"ready_ms": (time.perf_counter() - start) * 1000}
+
+        login_start = time.perf_counter()
+        client = login(url)
+        result["first_login_ms"] = (time.perf_counter() - login_start) * 1000
+        first = [timed_get(client, url + page) for page in PAGES]
+        warm = [timed_get(client, url + page) for page in PAGES]
+        result["first_pages_ms"] = sum(first)
+        result["warm_pages_ms"] = sum(warm)
+        return result
+    finally:
+        stop(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5, help="starts per configuration (medians are reported)")
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="iris-templates-")
+    stub, api_url = start_stub()
+    # No response cache, so first and warm page views make the same backend calls
+    env = {"TEMPLATE_CACHE_DIR": cache_dir, "PROMETHEUS_MULTIPROC_DIR": tempfile.mkdtemp(), "API_CACHE": "off"}
+    subprocess.run(
+        [sys.executable, "-m", "iris.warmup"],
+        cwd=ROOT,
+        env={**os.environ, **env, "API_URL": api_url, "SECRET_KEY": "benchmark"},
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+    report = {"rounds": args.rounds}
+    try:
+        for name in args.configs.split(","):
+            runs = [measure(api_url, {**env, **CONFIGS[name]}) for _ in range(args.rounds)]
+            report[name] = {
+                key: round(statistics.median(run[key] for run in runs), 1)
+                for key in runs[0]
+            }
+    finally:
+        stop(stub)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
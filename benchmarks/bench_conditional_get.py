@@ -0,0 +1,54 @@
+"""Measure what conditional GETs save on large, unchanged payloads
+
+Starts the stub API, expires every cached entry immediately so each request
+is revalidated, and reports the bytes and JSON parse time saved by 304s.
+
+    python -m benchmarks.bench_conditional_get --users 2000 --requests 200
+"""
+from .stub_api import StubData, create_stub_app, start_stub_server
+import argparse
+import json
+import os
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--responses", type=int, default=200, help="responses per session")
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint")
+    args = parser.parse_args()
+
+    data = StubData(users=args.users, standups=1, sessions=1, responses=args.responses)
+    stub = create_stub_app(data)
+    server = start_stub_server(stub)
+    os.environ["API_URL"] = server.url
+
+    from iris import cache, helpers
+    helpers.API_URL = server.url
+    response_cache = cache.ResponseCache(
+        cache.MemoryBackend(),
+        ttls={"/users/": 0, "/responses/": 0}
+    )
+    cache.response_cache = response_cache
+
+    token = helpers.api_request("post", "/token", form={"username": "user1"}).json()["access_token"]
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        for endpoint in ("/users/", "/responses/session/1"):
+            response = helpers.api_request("get", endpoint, token=token)
+            response.json()
+    elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    print(json.dumps({
+        "requests": args.requests * 2,
+        "elapsed": round(elapsed, 4),
+        "cache": response_cache.stats(),
+        "stub": stub.config["STUB_STATS"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare cookie sessions with the server-side session backends
+
+Logs in against the stub API with each SESSION_BACKEND, then reports the
+session cookie size and the cost of opening and saving the session for a
+request that only reads it and for one that rotates the tokens (as a
+refresh does).
+
+    python -m benchmarks.bench_sessions --rounds 5000
+"""
+from flask import Response, request
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.stub_api import StubData, create_stub_app, make_token, start_stub_server
+
+
+def timed(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds
+
+
+def measure(app, rounds):
+    client = app.test_client()
+    client.post("/login", data={"username": "user1", "password": "password"})
+    cookie_name = app.config["SESSION_COOKIE_NAME"]
+    cookie = client.get_cookie(cookie_name).value
+    interface = app.session_interface
+    new_token = make_token(1)
+
+    with app.test_request_context("/standup/", headers={"Cookie": f"{cookie_name}={cookie}"}):
+        def read_only():
+            session = interface.open_session(app, request)
+            session.get("token")
+            interface.save_session(app, session, Response())
+
+        def rotate_tokens():
+            session = interface.open_session(app, request)
+            session["token"] = new_token
+            response = Response()
+            interface.save_session(app, session, response)
+            return response
+
+        set_cookie = rotate_tokens().headers.get("Set-Cookie", "")
+        return {
+            "cookie_bytes": len(cookie_name) + 1 + len(cookie),
+            "set_cookie_bytes_on_refresh": len(set_cookie),
+            "read_only_us": timed(read_only, rounds) * 1e6,
+            "refresh_us": timed(rotate_tokens, rounds) * 1e6,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5000)
+    args = parser.parse_args()
+
+    server = start_stub_server(create_stub_app(StubData()))
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["API_URL"] = server.url
+    os.environ["API_CACHE"] = "off"
+    os.environ["SESSION_PATH"] = os.path.join(tempfile.mkdtemp(), "sessions.sqlite3")
+
+    from iris import create_app
+
+    results = {"rounds": args.rounds}
+    for backend in ("cookie", "memory", "sqlite"):
+        app = create_app(session_backend=backend)
+        results[backend] = {
+            key: round(value, 2) if isinstance(value, float) else value
+            for key, value in measure(app, args.rounds).items()
+        }
+
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
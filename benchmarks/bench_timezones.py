@@ -0,0 +1,110 @@
+"""Microbenchmark timezone handling in the standup templates
+
+Renders view_session.html with many responses and the edit form's timezone
+<select>, once with the original per-call pytz/fromisoformat filter and
+once with the cached engine in iris.timezones.
+
+    python -m benchmarks.bench_timezones --responses 500 --rounds 20
+"""
+from datetime import datetime
+from flask import render_template, render_template_string
+import argparse
+import json
+import os
+import pytz
+import time
+
+LEGACY_OPTIONS = """{% for tz in timezones %}
+<option value="{{ tz }}" {% if tz == selected %}selected{% endif %}>{{ tz }}</option>
+{% endfor %}"""
+
+
+def legacy_convert_timezone(value, source_tz='UTC', target_tz='UTC', format='%Y-%m-%d %I:%M %p'):
+    """The filter as it was before the cached engine, for comparison"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return value
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = pytz.timezone(source_tz).localize(value)
+        return value.astimezone(pytz.timezone(target_tz)).strftime(format)
+    return value
+
+
+def make_responses(count):
+    return [
+        {
+            "id": i,
+            "user_id": i,
+            "user": {"id": i, "username": f"user{i}"},
+            "yesterday": "Reviewed pull requests",
+            "today": "Shipping the release",
+            "blockers": "None",
+            "created_at": f"2025-05-01T14:{i % 60:02d}:{(i // 60) % 60:02d}",
+        }
+        for i in range(count)
+    ]
+
+
+def timed(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--responses", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    from iris import create_app
+
+    app = create_app()
+    cached_filter = app.jinja_env.filters["convert_timezone"]
+    responses = make_responses(args.responses)
+    context = {
+        "standup_session": {"id": 1, "standup_id": 1, "date": "2025-05-01T14:00:00"},
+        "responses": responses,
+        "user_has_responded": True,
+        "timezone": "US/Central",
+    }
+    results = {"responses": args.responses, "rounds": args.rounds}
+
+    with app.test_request_context("/standup/sessions/1"):
+        def render_session():
+            render_template("standup/view_session.html", **context)
+
+        render_session()
+        app.jinja_env.filters["convert_timezone"] = legacy_convert_timezone
+        results["view_session_legacy_ms"] = timed(render_session, args.rounds) * 1000
+        app.jinja_env.filters["convert_timezone"] = cached_filter
+        results["view_session_cached_ms"] = timed(render_session, args.rounds) * 1000
+
+        timestamps = [r["created_at"] for r in responses]
+        results["convert_legacy_ms"] = timed(
+            lambda: [legacy_convert_timezone(t, target_tz="US/Central") for t in timestamps], args.rounds
+        ) * 1000
+        results["convert_cached_ms"] = timed(
+            lambda: [cached_filter(t, target_tz="US/Central") for t in timestamps], args.rounds
+        ) * 1000
+
+        results["timezone_select_legacy_ms"] = timed(
+            lambda: render_template_string(
+                LEGACY_OPTIONS, timezones=pytz.all_timezones, selected="US/Central"
+            ),
+            args.rounds
+        ) * 1000
+        results["timezone_select_cached_ms"] = timed(
+            lambda: render_template_string("{{ timezone_options('US/Central') }}"), args.rounds
+        ) * 1000
+
+    print(json.dumps({k: round(v, 3) if isinstance(v, float) else v for k, v in results.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
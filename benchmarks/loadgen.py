@@ -0,0 +1,101 @@
+"""Concurrent HTTP load generator with latency percentiles"""
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import threading
+import time
+
+import requests
+
+
+def login(base_url, username="user1", password="password"):
+    """Return a requests session logged in to the frontend"""
+    client = requests.Session()
+    response = client.post(
+        f"{base_url}/login",
+        data={"username": username, "password": password},
+        allow_redirects=False,
+    )
+    if response.status_code != 302 or "session" not in client.cookies:
+        raise RuntimeError(f"Login as {username} failed: {response.status_code}")
+    return client
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    """Latency percentiles (ms), throughput and error count for a run"""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+
+
+def run_load(base_url, flow, concurrency=20, duration=10.0, cookies=None, warmup=0.0):
+    """Send requests from `concurrency` threads for `duration` seconds
+
+    flow is a list of (method, path, form) steps cycled by each thread;
+    form may be None. Responses with a 5xx status count as errors.
+    Returns summary stats for the whole run and per path.
+    """
+    results = {}
+    lock = threading.Lock()
+
+    def worker(offset):
+        client = requests.Session()
+        if cookies:
+            client.cookies.update(cookies)
+        steps = itertools.islice(itertools.cycle(flow), offset, None)
+        local = {}
+        measure_from = time.perf_counter() + warmup
+        deadline = measure_from + duration
+
+        for method, path, form in steps:
+            start = time.perf_counter()
+            if start >= deadline:
+                break
+            try:
+                response = client.request(method, f"{base_url}{path}", data=form, allow_redirects=False, timeout=60)
+                failed = response.status_code >= 500
+            except requests.RequestException:
+                failed = True
+            if start < measure_from:
+                continue
+
+            latencies, errors = local.setdefault(path, ([], [0]))
+            if failed:
+                errors[0] += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+        with lock:
+            for path, (latencies, errors) in local.items():
+                total = results.setdefault(path, ([], [0]))
+                total[0].extend(latencies)
+                total[1][0] += errors[0]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start - warmup
+
+    all_latencies = [latency for latencies, _ in results.values() for latency in latencies]
+    all_errors = sum(errors[0] for _, errors in results.values())
+    return {
+        "total": summarize(all_latencies, all_errors, elapsed),
+        "paths": {
+            path: summarize(latencies, errors[0], elapsed)
+            for path, (latencies, errors) in sorted(results.items())
+        },
+    }
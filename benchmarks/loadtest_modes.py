@@ -0,0 +1,53 @@
+"""Compare sync and gevent gunicorn workers under I/O-bound load
+
+Runs the stub API with an artificial latency, serves the app with the
+same number of workers in each mode, and drives the standup pages with
+many concurrent clients. The response cache is disabled so every page
+waits on the backend.
+
+    python -m benchmarks.loadtest_modes --latency 0.1 --concurrency 100
+"""
+from .loadgen import login, run_load
+from .servers import start_gunicorn, start_stub, stop
+import argparse
+import json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.1, help="stub API latency per call (s)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--modes", default="sync,gevent")
+    args = parser.parse_args()
+
+    stub, api_url = start_stub("--latency", str(args.latency))
+    flow = [
+        ("GET", "/standup/dashboard", None),
+        ("GET", "/standup/1", None),
+        ("GET", "/standup/sessions/1", None),
+    ]
+    report = {"latency_s": args.latency, "workers": args.workers, "concurrency": args.concurrency}
+
+    try:
+        for mode in args.modes.split(","):
+            app, url = start_gunicorn(
+                api_url,
+                workers=args.workers,
+                env={"SERVING_MODE": mode, "API_CACHE": "off"},
+                args=["--config", "gunicorn.conf.py"],
+            )
+            try:
+                cookies = login(url).cookies
+                report[mode] = run_load(url, flow, args.concurrency, args.duration, cookies, warmup=1.0)["total"]
+            finally:
+                stop(app)
+    finally:
+        stop(stub)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Start the stub API and the real app under gunicorn as subprocesses"""
+from pathlib import Path
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, timeout=60):
+    """Poll url until it answers (any status) or raise after timeout seconds"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1, allow_redirects=False)
+            return
+        except requests.RequestException:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def start_stub(*args, port=None):
+    """Run benchmarks.stub_api with extra CLI args; returns (process, url)"""
+    port = port or free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_api", "--port", str(port), *args],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    wait_for(f"{url}/users/")
+    return process, url
+
+
+def start_gunicorn(api_url, workers=2, env=None, args=(), port=None, wait=True):
+    """Run run:app under gunicorn against api_url; returns (process, url)"""
+    port = port or free_port()
+    process_env = dict(os.environ)
+    process_env.update({"API_URL": api_url, "SECRET_KEY": process_env.get("SECRET_KEY", "benchmark")})
+    process_env.update(env or {})
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn",
+            "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers),
+            "--log-level", "warning",
+            *args,
+            "run:app",
+        ],
+        cwd=ROOT,
+        env=process_env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    if wait:
+        wait_for(f"{url}/login")
+    return process, url
@@ -0,0 +1,334 @@
+"""Local stand-in for the FastAPI backend
+
+Serves the endpoints the frontend calls with generated data, configurable
+payload sizes and an artificial per-request latency. GET responses carry
+ETag/Last-Modified validators and honour If-None-Match/If-Modified-Since.
+
+    python -m benchmarks.stub_api --port 8001 --sessions 500 --latency 0.05
+"""
+from email.utils import formatdate, parsedate_to_datetime
+from flask import Flask, Response, request
+from werkzeug.serving import make_server
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+STUB_SECRET = b"iris-stub-secret"
+
+
+def make_token(user_id, kind="access", lifetime=900):
+    """Return an HS256 JWT signed with the stub secret"""
+    def encode(part):
+        raw = json.dumps(part, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+    header = encode({"alg": "HS256", "typ": "JWT"})
+    payload = encode({"sub": str(user_id), "type": kind, "exp": int(time.time()) + lifetime})
+    signature = hmac.new(STUB_SECRET, f"{header}.{payload}".encode("ascii"), hashlib.sha256).digest()
+    return f"{header}.{payload}.{base64.urlsafe_b64encode(signature).rstrip(b'=').decode('ascii')}"
+
+
+class StubData:
+    """Deterministic users, standups, sessions and responses"""
+
+    def __init__(self, users=20, standups=5, sessions=30, responses=10, text_size=80):
+        self.modified = time.time()
+        filler = ("lorem ipsum dolor sit amet " * (text_size // 27 + 1))[:text_size]
+
+        self.users = [
+            {
+                "id": i,
+                "username": f"user{i}",
+                "email": f"user{i}@example.com",
+                "role": "admin" if i == 1 else "developer",
+            }
+            for i in range(1, users + 1)
+        ]
+
+        self.standups = {}
+        for i in range(1, standups + 1):
+            members = self.users[: min(len(self.users), responses + 1)]
+            self.standups[i] = {
+                "id": i,
+                "name": f"Standup {i}",
+                "days_of_week": "0,1,2,3,4",
+                "time_of_day": "09:30:00",
+                "timezone": "US/Central",
+                "duration_minutes": 15,
+                "facilitator_id": 1,
+                "facilitator": self.users[0],
+                "members": members,
+            }
+
+        self.sessions = {}
+        self.responses = {}
+        session_id = 0
+        for standup in self.standups.values():
+            for day in range(sessions):
+                session_id += 1
+                self.sessions[session_id] = {
+                    "id": session_id,
+                    "standup_id": standup["id"],
+                    "date": time.strftime("%Y-%m-%dT14:30:00", time.gmtime(1704067200 + day * 86400)),
+                    "is_completed": day < sessions - 1,
+                }
+                self.responses[session_id] = [
+                    {
+                        "id": session_id * 1000 + user["id"],
+                        "session_id": session_id,
+                        "user_id": user["id"],
+                        "user": user,
+                        "yesterday": filler,
+                        "today": filler,
+                        "blockers": "None",
+                        "created_at": self.sessions[session_id]["date"],
+                    }
+                    for user in self.users[1: responses + 1]
+                ]
+        self._next_id = 10 ** 7
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        with self._lock:
+            self._next_id += 1
+            self.modified = time.time()
+            return self._next_id
+
+    def touch(self):
+        self.modified = time.time()
+
+
+def create_stub_app(data=None, latency=0.0, validators=True, paginate=False, endpoint_latency=None):
+    """Build the stub backend as a Flask app
+
+    endpoint_latency maps path prefixes to seconds, overriding latency for
+    matching requests (longest prefix wins). With paginate, listings honour
+    skip/limit query params; otherwise they are ignored like an API without
+    paging support.
+    """
+    app = Flask("iris-stub-api")
+    data = data or StubData()
+    app.config["STUB_DATA"] = data
+    app.config["STUB_STATS"] = {"requests": 0, "not_modified": 0, "bytes_sent": 0}
+    stats_lock = threading.Lock()
+
+    def count(name, value=1):
+        with stats_lock:
+            app.config["STUB_STATS"][name] += value
+
+    latency_prefixes = sorted(endpoint_latency or {}, key=len, reverse=True)
+
+    @app.before_request
+    def simulate_latency():
+        count("requests")
+        delay = latency
+        for prefix in latency_prefixes:
+            if request.path.startswith(prefix):
+                delay = endpoint_latency[prefix]
+                break
+        if delay:
+            time.sleep(delay)
+
+    def current_user_id():
+        auth = request.headers.get("Authorization", "")
+        try:
+            payload = auth.split(" ", 1)[1].split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            return int(json.loads(base64.urlsafe_b64decode(payload))["sub"])
+        except (IndexError, KeyError, ValueError):
+            return None
+
+    def send(obj, status=200):
+        body = json.dumps(obj).encode("utf-8")
+        headers = {}
+
+        if validators and request.method == "GET":
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            headers["ETag"] = etag
+            headers["Last-Modified"] = formatdate(data.modified, usegmt=True)
+
+            if request.headers.get("If-None-Match") == etag:
+                count("not_modified")
+                return Response(status=304, headers=headers)
+
+            since = request.headers.get("If-Modified-Since")
+            if since and "If-None-Match" not in request.headers:
+                try:
+                    if parsedate_to_datetime(since).timestamp() >= int(data.modified):
+                        count("not_modified")
+                        return Response(status=304, headers=headers)
+                except (TypeError, ValueError):
+                    pass
+
+        count("bytes_sent", len(body))
+        return Response(body, status=status, headers=headers, mimetype="application/json")
+
+    def listing(rows):
+        if paginate:
+            skip = request.args.get("skip", 0, type=int)
+            limit = request.args.get("limit", type=int)
+            rows = rows[skip: skip + limit if limit is not None else None]
+        return send(rows)
+
+    def not_found():
+        return send({"detail": "Not found"}, 404)
+
+    def unauthorized():
+        return send({"detail": "Could not validate credentials"}, 401)
+
+    @app.post("/token")
+    def token():
+        for user in data.users:
+            if user["username"] == request.form.get("username"):
+                return send({
+                    "access_token": make_token(user["id"]),
+                    "refresh_token": make_token(user["id"], "refresh", 86400),
+                    "token_type": "bearer",
+                })
+        return unauthorized()
+
+    @app.post("/token/refresh")
+    def refresh():
+        refresh_token = request.form.get("refresh_token", "")
+        try:
+            payload = refresh_token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            user_id = int(json.loads(base64.urlsafe_b64decode(payload))["sub"])
+        except (IndexError, KeyError, ValueError):
+            return unauthorized()
+        return send({"access_token": make_token(user_id), "token_type": "bearer"})
+
+    @app.get("/users/me/")
+    def me():
+        user_id = current_user_id()
+        if user_id is None or user_id > len(data.users):
+            return unauthorized()
+        return send(data.users[user_id - 1])
+
+    @app.get("/users/")
+    def users():
+        return send(data.users)
+
+    @app.post("/users/")
+    def register():
+        user = dict(request.json or {}, id=data.next_id())
+        user.pop("password", None)
+        return send(user)
+
+    @app.get("/standups/")
+    def standups():
+        return send(list(data.standups.values()))
+
+    @app.get("/standups/<int:standup_id>")
+    def standup(standup_id):
+        if standup_id not in data.standups:
+            return not_found()
+        return send(data.standups[standup_id])
+
+    @app.post("/standups/")
+    def create_standup():
+        standup_id = data.next_id()
+        data.standups[standup_id] = dict(request.json or {}, id=standup_id, members=[])
+        return send(data.standups[standup_id])
+
+    @app.put("/standups/<int:standup_id>")
+    def update_standup(standup_id):
+        if standup_id not in data.standups:
+            return not_found()
+        data.standups[standup_id].update(request.json or {})
+        data.touch()
+        return send(data.standups[standup_id])
+
+    @app.get("/sessions/standup/<int:standup_id>")
+    def standup_sessions(standup_id):
+        return listing([s for s in data.sessions.values() if s["standup_id"] == standup_id])
+
+    @app.get("/sessions/<int:session_id>")
+    def session(session_id):
+        if session_id not in data.sessions:
+            return not_found()
+        standup_session = dict(data.sessions[session_id])
+        standup_session["standup"] = data.standups.get(standup_session["standup_id"], {})
+        return send(standup_session)
+
+    @app.post("/sessions/")
+    def create_session():
+        session_id = data.next_id()
+        data.sessions[session_id] = dict(request.json or {}, id=session_id, is_completed=False)
+        data.responses[session_id] = []
+        return send(data.sessions[session_id])
+
+    @app.get("/responses/session/<int:session_id>")
+    def session_responses(session_id):
+        return listing(data.responses.get(session_id, []))
+
+    @app.post("/responses/")
+    def create_response():
+        body = dict(request.json or {})
+        user_id = current_user_id()
+        response = dict(
+            body,
+            id=data.next_id(),
+            user_id=user_id,
+            user=data.users[user_id - 1] if user_id and user_id <= len(data.users) else None,
+            created_at=time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()),
+        )
+        data.responses.setdefault(body.get("session_id"), []).append(response)
+        return send(response)
+
+    return app
+
+
+def start_stub_server(app=None, host="127.0.0.1", port=0):
+    """Serve the stub in a background thread and return the server"""
+    server = make_server(host, port, app or create_stub_app(), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://{host}:{server.server_port}"
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stub of the backend API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--standups", type=int, default=5)
+    parser.add_argument("--sessions", type=int, default=30, help="sessions per standup")
+    parser.add_argument("--responses", type=int, default=10, help="responses per session")
+    parser.add_argument("--text-size", type=int, default=80, help="characters per response field")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument(
+        "--endpoint-latency",
+        action="append",
+        default=[],
+        metavar="PREFIX=SECONDS",
+        help="latency for paths starting with PREFIX (repeatable)"
+    )
+    parser.add_argument("--no-validators", action="store_true", help="don't send ETag/Last-Modified")
+    parser.add_argument("--paginate", action="store_true", help="honour skip/limit on listings")
+    args = parser.parse_args()
+
+    data = StubData(args.users, args.standups, args.sessions, args.responses, args.text_size)
+    endpoint_latency = {}
+    for item in args.endpoint_latency:
+        prefix, _, seconds = item.partition("=")
+        endpoint_latency[prefix] = float(seconds)
+
+    app = create_stub_app(
+        data,
+        latency=args.latency,
+        validators=not args.no_validators,
+        paginate=args.paginate,
+        endpoint_latency=endpoint_latency
+    )
+    print(f"Stub API listening on http://{args.host}:{args.port}")
+    make_server(args.host, args.port, app, threaded=True).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
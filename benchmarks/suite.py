@@ -0,0 +1,153 @@
+"""Throughput and latency benchmark for the frontend
+
+Starts the stub API, serves the real create_app() under gunicorn and drives
+each user flow with concurrent clients. The report (JSON) has p50/p95/p99
+latency and RPS per flow plus the RSS of every gunicorn worker, and can be
+compared against a previous report to catch regressions.
+
+    python -m benchmarks --duration 15 --concurrency 32 --output report.json
+    python -m benchmarks --baseline report.json --max-regression 0.15
+"""
+from .loadgen import login, run_load
+from .servers import start_gunicorn, start_stub, stop
+from pathlib import Path
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+FLOWS = {
+    "dashboard": [("GET", "/standup/dashboard", None)],
+    "view": [("GET", "/standup/1", None)],
+    "view_session": [("GET", "/standup/sessions/1", None)],
+    "login": [("POST", "/login", {"username": "user1", "password": "password"})],
+    "edit": [("GET", "/standup/1/edit", None)],
+}
+
+
+def worker_rss(master_pid):
+    """Return {pid: RSS in KiB} for the gunicorn workers forked by master_pid"""
+    rss = {}
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            status = (entry / "status").read_text()
+        except OSError:
+            continue
+        fields = dict(line.split(":", 1) for line in status.splitlines() if ":" in line)
+        if fields.get("PPid", "").strip() == str(master_pid) and "VmRSS" in fields:
+            rss[int(entry.name)] = int(fields["VmRSS"].split()[0])
+    return rss
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent.parent,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, max_regression):
+    """Return descriptions of flows that got slower or slower-throughput than baseline"""
+    regressions = []
+    for flow, result in report["flows"].items():
+        before = baseline.get("flows", {}).get(flow)
+        if not before:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if before.get(metric) and result.get(metric) and result[metric] > before[metric] * (1 + max_regression):
+                regressions.append(f"{flow} {metric}: {before[metric]} -> {result[metric]}")
+        if before.get("rps") and result["rps"] < before["rps"] * (1 - max_regression):
+            regressions.append(f"{flow} rps: {before['rps']} -> {result['rps']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flows", default=",".join(FLOWS), help="comma-separated flows to run")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per flow")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds per flow")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--serving-mode", default="sync", choices=("sync", "gevent"))
+    parser.add_argument("--app-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra environment for the app (repeatable), e.g. API_CACHE=off")
+    parser.add_argument("--latency", type=float, default=0.02, help="stub API latency per call (s)")
+    parser.add_argument("--endpoint-latency", action="append", default=[], metavar="PREFIX=SECONDS")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=200, help="sessions per standup")
+    parser.add_argument("--responses", type=int, default=20, help="responses per session")
+    parser.add_argument("--text-size", type=int, default=200)
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed fractional slowdown before failing")
+    args = parser.parse_args()
+
+    stub_args = [
+        "--latency", str(args.latency),
+        "--users", str(args.users),
+        "--standups", "3",
+        "--sessions", str(args.sessions),
+        "--responses", str(args.responses),
+        "--text-size", str(args.text_size),
+    ]
+    for item in args.endpoint_latency:
+        stub_args += ["--endpoint-latency", item]
+
+    app_env = {"SERVING_MODE": args.serving_mode}
+    app_env.update(item.split("=", 1) for item in args.app_env)
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "baseline")
+        },
+        "flows": {},
+    }
+
+    stub, api_url = start_stub(*stub_args)
+    try:
+        app, url = start_gunicorn(
+            api_url,
+            workers=args.workers,
+            env=app_env,
+            args=["--config", "gunicorn.conf.py"],
+        )
+        try:
+            cookies = login(url).cookies
+            for flow in args.flows.split(","):
+                result = run_load(url, FLOWS[flow], args.concurrency, args.duration, cookies, args.warmup)
+                report["flows"][flow] = result["total"]
+            report["worker_rss_kib"] = sorted(worker_rss(app.pid).values())
+        finally:
+            stop(app)
+    finally:
+        stop(stub)
+
+    exit_code = 0
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        report["regressions"] = compare(report, baseline, args.max_regression)
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,57 @@
+"""Compile the color palette CSS from palette.json
+
+    python generate_colors.py                 # only the classes the templates use
+    python generate_colors.py --all --force   # every class, even if unchanged
+
+compile_palette() and build() can also be called directly.
+"""
+import argparse
 import colorsys
+import hashlib
+import json
 import os
+import re
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG = os.path.join(ROOT, "palette.json")
+DEFAULT_OUTPUT = os.path.join(ROOT, "iris", "static", "css", "color-palette.css")
+DEFAULT_TEMPLATES = [os.path.join(ROOT, "iris", "templates")]
+
+# Bump when the generated CSS changes for the same inputs, to force a rebuild
+COMPILER_VERSION = "2"
+
+# (saturation change, lightness change) applied to the base color for each shade
+SHADE_STEPS = {
+    **{i * 100: (-0.05 * i, 0.1 + 0.15 * (5 - i)) for i in range(1, 5)},
+    500: (0.0, 0.0),
+    **{500 + i * 100: (0.05 * i, -0.06 * i) for i in range(1, 5)},
+}
+
+# Class prefix -> property set to the color; each also gets a hover: variant
+COLOR_PROPERTIES = {
+    "bg": "background-color",
+    "text": "color",
+    "border": "border-color",
+    "border-t": "border-top-color",
+    "border-r": "border-right-color",
+    "border-b": "border-bottom-color",
+    "border-l": "border-left-color",
+}
+
+# Border width utilities (similar to Tailwind's defaults)
+BORDER_WIDTHS = {
+    '': '1px',      # Default border width
+    '-0': '0px',
+    '-2': '2px',
+    '-4': '4px',
+    '-8': '8px',
+}
+BORDER_SIDES = {"": "border-width", "-t": "border-top-width", "-r": "border-right-width",
+                "-b": "border-bottom-width", "-l": "border-left-width"}
+BORDER_STYLES = ["solid", "dashed", "dotted", "double", "none"]
+
+HASH_PREFIX = "/* palette-hash: "
+
 
 def hex_to_rgb(hex_color):
     hex_color = hex_color.lstrip('#')
@@ -12,140 +64,115 @@ def rgb_to_hex(rgb):
         max(0, min(255, int(rgb[2])))
     )
 
-def rgb_to_hsl(rgb):
-    r, g, b = [x / 255.0 for x in rgb]
-    h, l, s = colorsys.rgb_to_hls(r, g, b)
-    return (h, s, l)
-
-def hsl_to_rgb(hsl):
-    h, s, l = hsl
-    r, g, b = colorsys.hls_to_rgb(h, l, s)
-    return (int(r * 255), int(g * 255), int(b * 255))
+def compute_shades(colors):
+    """Return {color: {shade: hex}} for every color and shade in one pass"""
+    bases = {
+        name: colorsys.rgb_to_hls(*(x / 255.0 for x in hex_to_rgb(value)))
+        for name, value in colors.items()
+    }
+    return {
+        name: {
+            shade: base if shade == 500 else rgb_to_hex(tuple(
+                int(x * 255) for x in colorsys.hls_to_rgb(
+                    h, min(1.0, max(0.0, l + dl)), min(1.0, max(0.0, s + ds))
+                )
+            ))
+            for shade, (ds, dl) in SHADE_STEPS.items()
+        }
+        for (name, (h, l, s)), base in zip(bases.items(), colors.values())
+    }
 
 def generate_color_shades(base_color):
-    rgb = hex_to_rgb(base_color)
-    hsl = rgb_to_hsl(rgb)
-    
-    shades = {}
-    
-    # Generate lighter shades (100-400)
-    for i in range(1, 5):
-        shade_num = i * 100
-        lightness_factor = 0.1 + (0.15 * (5 - i))
-        new_lightness = min(1.0, hsl[2] + lightness_factor)
-        new_hsl = (hsl[0], max(0, hsl[1] - 0.05 * i), new_lightness)
-        new_rgb = hsl_to_rgb(new_hsl)
-        shades[shade_num] = rgb_to_hex(new_rgb)
-    
-    # Base color (500)
-    shades[500] = base_color
-    
-    # Generate darker shades (600-900)
-    for i in range(1, 5):
-        shade_num = 500 + (i * 100)
-        darkness_factor = 0.06 * i
-        new_lightness = max(0, hsl[2] - darkness_factor)
-        new_saturation = min(1.0, hsl[1] + 0.05 * i)
-        new_hsl = (hsl[0], new_saturation, new_lightness)
-        new_rgb = hsl_to_rgb(new_hsl)
-        shades[shade_num] = rgb_to_hex(new_rgb)
-    
-    return shades
-
-# Your custom colors
-colors = {
-    'primary': '#00388f',
-    'secondary': '#686e74',
-    'info': '#0074b3',
-    'success': '#2d7e24',
-    'danger': '#c70032',
-    'warning': '#ea712f',
-    'dark': '#25303a',
-    'light': '#f3f4f6',
-}
+    return compute_shades({"color": base_color})["color"]
 
-# Ensure the directory exists
-os.makedirs('static/css', exist_ok=True)
+def palette_classes(colors):
+    """Yield (class name, CSS rule) for every utility the palette can produce"""
+    for color_name in colors:
+        for shade in SHADE_STEPS:
+            variable = f"--color-{color_name}-{shade}"
+            for prefix, prop in COLOR_PROPERTIES.items():
+                name = f"{prefix}-{color_name}-{shade}"
+                yield name, f".{name} {{ {prop}: var({variable}); }}\n"
+                yield f"hover:{name}", f".hover\\:{name}:hover {{ {prop}: var({variable}); }}\n"
 
-# Generate CSS variables
-css_variables = ":root {\n"
-utility_classes = ""
+    for suffix, width in BORDER_WIDTHS.items():
+        for side, prop in BORDER_SIDES.items():
+            name = f"border{side}{suffix}"
+            yield name, f".{name} {{ {prop}: {width}; }}\n"
 
-# Border width utilities (similar to Tailwind's defaults)
-border_widths = {
-    '': '1px',      # Default border width
-    '-0': '0px',
-    '-2': '2px',
-    '-4': '4px',
-    '-8': '8px',
-}
+    for style in BORDER_STYLES:
+        yield f"border-{style}", f".border-{style} {{ border-style: {style}; }}\n"
 
-for color_name, hex_value in colors.items():
-    shades = generate_color_shades(hex_value)
-    
-    for shade_num, shade_hex in shades.items():
-        variable_name = f"--color-{color_name}-{shade_num}"
-        css_variables += f"  {variable_name}: {shade_hex};\n"
-        
-        # Generate utility classes for background colors
-        utility_classes += f".bg-{color_name}-{shade_num} {{ background-color: var({variable_name}); }}\n"
-        utility_classes += f".hover\\:bg-{color_name}-{shade_num}:hover {{ background-color: var({variable_name}); }}\n"
-        
-        # Generate utility classes for text colors
-        utility_classes += f".text-{color_name}-{shade_num} {{ color: var({variable_name}); }}\n"
-        utility_classes += f".hover\\:text-{color_name}-{shade_num}:hover {{ color: var({variable_name}); }}\n"
-        
-        # Generate utility classes for border colors
-        # Standard border (all sides)
-        utility_classes += f".border-{color_name}-{shade_num} {{ border-color: var({variable_name}); }}\n"
-        utility_classes += f".hover\\:border-{color_name}-{shade_num}:hover {{ border-color: var({variable_name}); }}\n"
-        
-        # Border top
-        utility_classes += f".border-t-{color_name}-{shade_num} {{ border-top-color: var({variable_name}); }}\n"
-        utility_classes += f".hover\\:border-t-{color_name}-{shade_num}:hover {{ border-top-color: var({variable_name}); }}\n"
-        
-        # Border right
-        utility_classes += f".border-r-{color_name}-{shade_num} {{ border-right-color: var({variable_name}); }}\n"
-        utility_classes += f".hover\\:border-r-{color_name}-{shade_num}:hover {{ border-right-color: var({variable_name}); }}\n"
-        
-        # Border bottom
-        utility_classes += f".border-b-{color_name}-{shade_num} {{ border-bottom-color: var({variable_name}); }}\n"
-        utility_classes += f".hover\\:border-b-{color_name}-{shade_num}:hover {{ border-bottom-color: var({variable_name}); }}\n"
-        
-        # Border left
-        utility_classes += f".border-l-{color_name}-{shade_num} {{ border-left-color: var({variable_name}); }}\n"
-        utility_classes += f".hover\\:border-l-{color_name}-{shade_num}:hover {{ border-left-color: var({variable_name}); }}\n"
-
-css_variables += "}\n\n"
-
-# Add border width utilities (similar to Tailwind's)
-border_width_classes = ""
-for suffix, width in border_widths.items():
-    # All sides
-    border_width_classes += f".border{suffix} {{ border-width: {width}; }}\n"
-    
-    # Individual sides
-    border_width_classes += f".border-t{suffix} {{ border-top-width: {width}; }}\n"
-    border_width_classes += f".border-r{suffix} {{ border-right-width: {width}; }}\n"
-    border_width_classes += f".border-b{suffix} {{ border-bottom-width: {width}; }}\n"
-    border_width_classes += f".border-l{suffix} {{ border-left-width: {width}; }}\n"
-
-# Add border style utilities
-border_style_classes = """
-.border-solid { border-style: solid; }
-.border-dashed { border-style: dashed; }
-.border-dotted { border-style: dotted; }
-.border-double { border-style: double; }
-.border-none { border-style: none; }
-"""
+def used_classes(folders):
+    """Every word in the templates that could be a class name"""
+    tokens = set()
+    for folder in folders:
+        for root, _, names in os.walk(folder):
+            for name in names:
+                if name.endswith((".html", ".js")):
+                    with open(os.path.join(root, name), encoding="utf-8") as f:
+                        tokens.update(re.split(r"""[\s"'`<>=(){};,]+""", f.read()))
+    tokens.discard("")
+    return tokens
+
+def compile_palette(colors, used=None):
+    """Return the palette CSS; with `used`, only the utility classes in it"""
+    shades = compute_shades(colors)
+
+    css = [":root {\n"]
+    for color_name, color_shades in shades.items():
+        for shade, value in color_shades.items():
+            css.append(f"  --color-{color_name}-{shade}: {value};\n")
+    css.append("}\n\n")
+
+    css.extend(rule for name, rule in palette_classes(colors) if used is None or name in used)
+    return "".join(css)
+
+def load_config(path):
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    return config["colors"]
+
+def inputs_hash(colors, used):
+    data = json.dumps({"version": COMPILER_VERSION, "colors": colors,
+                       "used": sorted(used) if used is not None else None}, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+def build(config=DEFAULT_CONFIG, output=DEFAULT_OUTPUT, templates=DEFAULT_TEMPLATES, all_classes=False, force=False):
+    """Write the palette CSS unless it's already up to date; return whether it was written"""
+    colors = load_config(config)
+    used = None if all_classes else used_classes(templates)
+    if used is not None:
+        # Only the palette's own classes matter for the hash
+        used &= {name for name, _ in palette_classes(colors)}
+
+    digest = inputs_hash(colors, used)
+    header = f"{HASH_PREFIX}{digest} */\n"
+    if not force and os.path.exists(output):
+        with open(output, encoding="utf-8") as f:
+            if f.readline() == header:
+                return False
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(header)
+        f.write(compile_palette(colors, used))
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the color palette CSS")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="JSON file with a \"colors\" map")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--templates", action="append", help="folder to scan for used classes (repeatable)")
+    parser.add_argument("--all", action="store_true", help="emit every class, not only the used ones")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the inputs are unchanged")
+    args = parser.parse_args()
 
-# Write to a CSS file
-with open('iris/static/css/color-palette.css', 'w') as f:
-    f.write(css_variables)
-    f.write(utility_classes)
-    f.write("\n/* Border Width Utilities */\n")
-    f.write(border_width_classes)
-    f.write("\n/* Border Style Utilities */\n")
-    f.write(border_style_classes)
+    written = build(args.config, args.output, args.templates or DEFAULT_TEMPLATES, args.all, args.force)
+    if written:
+        print(f"Generated color palette CSS file at {os.path.relpath(args.output)}")
+    else:
+        print(f"{os.path.relpath(args.output)} is up to date")
 
-print("Generated color palette CSS file at static/css/color-palette.css")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Gunicorn settings, read automatically when gunicorn starts from the project root.
+# Command-line flags (see startup.sh) take precedence over these values.
+import glob
+import os
+import tempfile
+
+# SERVING_MODE=gevent runs each worker's requests as green threads, so hundreds of
+# in-flight backend calls can share a few processes. create_app() reads the same
+# variable to make the backend client green-thread friendly.
+if os.getenv("SERVING_MODE", "sync").lower() == "gevent":
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("GEVENT_WORKER_CONNECTIONS", "1000"))
+else:
+    worker_class = "sync"
+
+# GUNICORN_PRELOAD=true imports the app once in the master, so workers fork with it
+# (and, with WARM_UP, its loaded templates) already in memory. Not with gevent: its
+# workers must patch the standard library before the app is imported.
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() == "true" and worker_class == "sync"
+
+
+# Workers write their metrics to files in this directory so /metrics can report
+# totals for the whole server. It must be set before the app is imported.
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "iris-metrics")
+)
+
+
+def on_starting(server):
+    # Start from zero instead of adding to the previous run's counters
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # With WARM_UP, connect to the backend before this worker accepts requests
+    from iris import warmup
+    if warmup.WARM_UP:
+        warmup.warm_backend()
@@ -2,7 +2,6 @@ from flask import Flask
 from datetime import datetime
 from dotenv import load_dotenv
 import logging
-import pytz
 import os
 
 load_dotenv()
@@ -10,16 +9,49 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def create_app():
+def create_app(stream_pages=None, serving_mode=None, session_backend=None):
     app = Flask(__name__)
     app.secret_key = os.getenv("SECRET_KEY")
 
+    # "cookie" keeps Flask's signed-cookie sessions; "memory"/"sqlite" store them server-side
+    from . import sessions
+    app.config["SESSION_BACKEND"] = sessions.SESSION_BACKEND if session_backend is None else session_backend
+    session_interface = sessions.create_session_interface(app.config["SESSION_BACKEND"])
+    if session_interface is not None:
+        app.session_interface = session_interface
+
+    # "sync" or "gevent"; must match the gunicorn worker class (see gunicorn.conf.py)
+    from . import helpers
+    app.config["SERVING_MODE"] = helpers.SERVING_MODE if serving_mode is None else serving_mode
+    helpers.configure_concurrency(app.config["SERVING_MODE"])
+
+    from . import streaming
+    app.config["STREAM_PAGES"] = streaming.STREAM_PAGES if stream_pages is None else stream_pages
+    app.config["STREAM_BUFFER_SIZE"] = streaming.STREAM_BUFFER_SIZE
+    app.add_template_global(streaming.stream_flush, 'stream_flush')
+
+    # Registered first so its after_request hook runs last, on the final body
+    from . import compression
+    compression.init_app(app)
+
+    from . import instrumentation
+    instrumentation.init_app(app)
+
+    from . import metrics
+    metrics.init_app(app)
+
+    # Fingerprinted, precompressed static files (built by `python -m iris.assets`)
+    from . import assets
+    assets.init_app(app)
+
     from . import main
     app.register_blueprint(main.bp)
 
     from . import standup
     app.register_blueprint(standup.bp)
 
+    from . import timezones
+
     @app.template_filter('format_date')
     def format_date(value, format='%Y-%m-%d %I:%M %p'):
         if isinstance(value, str):
@@ -48,26 +80,14 @@ def create_app():
     @app.template_filter('convert_timezone')
     def convert_timezone(value, source_tz='UTC', target_tz='UTC', format='%Y-%m-%d %I:%M %p'):
         """Convert datetime from one timezone to another and format it"""
-        if isinstance(value, str):
-            try:
-                # Parse the string to datetime, assuming it's in UTC if no timezone info
-                value = datetime.fromisoformat(value.replace('Z', '+00:00'))
-            except ValueError:
-                return value
-        
-        if isinstance(value, datetime):
-            # If the datetime has no timezone info, assume it's in source_tz
-            if value.tzinfo is None:
-                source_timezone = pytz.timezone(source_tz)
-                value = source_timezone.localize(value)
-            
-            # Convert to target timezone
-            target_timezone = pytz.timezone(target_tz)
-            converted = value.astimezone(target_timezone)
-            
-            # Format the datetime
-            return converted.strftime(format)
-        
-        return value
+        return timezones.convert_timezone(value, source_tz, target_tz, format)
+
+
+    # The timezone <select> options are rendered once, on first use
+    app.add_template_global(timezones.timezone_options, 'timezone_options')
+
+    # Template bytecode cache, and the optional warm-up (after the filters, which templates need to compile)
+    from . import warmup
+    warmup.init_app(app)
 
     return app
@@ -0,0 +1,408 @@
+"""Static asset pipeline
+
+`python -m iris.assets` purges CSS rules whose classes no template uses,
+minifies the stylesheets, copies them and the files they reference to
+static/dist under content-hashed names, precompresses them (gzip, and
+brotli when installed) and writes a manifest. At runtime init_app() makes
+url_for("static", ...) resolve to the hashed files and serves them with a
+long-lived immutable Cache-Control, picking the precompressed variant the
+client accepts.
+"""
+from flask import request, send_from_directory
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+# Cache lifetime of fingerprinted files; they never change under the same name
+ASSET_MAX_AGE = int(os.getenv("ASSET_MAX_AGE", "31536000"))
+
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".html")
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+_STRING = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""")
+_CLASS = re.compile(r"\.((?:\\.|[A-Za-z0-9_-])+)")
+_NOT = re.compile(r":not\((?:[^()]|\([^()]*\))*\)")
+_URL = re.compile(r"""url\(\s*(["']?)([^"')]+)\1\s*\)""")
+_TOKEN_SEPARATORS = re.compile(r"""[\s"'`<>=(){};,]+""")
+
+
+# Parsing ------------------------------------------------------------------
+
+def parse_css(css):
+    """Parse a stylesheet into a tree of nodes
+
+    Nodes are ("comment", text) for /*! */ comments, ("decl", text),
+    ("stmt", text) for at-rules ending in ";" and ("block", prelude,
+    children) for rules and block at-rules, including nested rules.
+    """
+    nodes, _ = _parse(css, 0, top=True)
+    return nodes
+
+
+def _parse(css, i, top=False):
+    nodes = []
+    buffer = []
+    depth = 0  # parentheses, so ";" in url(...) doesn't end a declaration
+    length = len(css)
+
+    while i < length:
+        char = css[i]
+
+        if char == "/" and css.startswith("/*", i):
+            end = css.find("*/", i + 2)
+            end = length if end == -1 else end + 2
+            if top and css.startswith("/*!", i) and not "".join(buffer).strip():
+                nodes.append(("comment", css[i:end]))
+            i = end
+            continue
+
+        if char in "\"'":
+            match = _STRING.match(css, i)
+            text = match.group(0) if match else css[i:]
+            buffer.append(text)
+            i += len(text)
+            continue
+
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(0, depth - 1)
+        elif depth == 0 and char == "{":
+            children, i = _parse(css, i + 1)
+            nodes.append(("block", "".join(buffer).strip(), children))
+            buffer = []
+            continue
+        elif depth == 0 and char == ";":
+            _flush(nodes, buffer)
+            buffer = []
+            i += 1
+            continue
+        elif depth == 0 and char == "}":
+            _flush(nodes, buffer)
+            return nodes, i + 1
+
+        buffer.append(char)
+        i += 1
+
+    _flush(nodes, buffer)
+    return nodes, i
+
+
+def _flush(nodes, buffer):
+    text = "".join(buffer).strip()
+    if text:
+        nodes.append(("stmt" if text.startswith("@") else "decl", text))
+
+
+# Purging ------------------------------------------------------------------
+
+def used_tokens(paths):
+    """Every word in the given files that could be a class name"""
+    tokens = set()
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            tokens.update(_TOKEN_SEPARATORS.split(f.read()))
+    tokens.discard("")
+    return tokens
+
+
+def _split_selectors(prelude):
+    """Split a selector list on the commas that aren't inside (...) or [...]"""
+    selectors = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(prelude):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            selectors.append(prelude[start:i].strip())
+            start = i + 1
+    selectors.append(prelude[start:].strip())
+    return selectors
+
+
+def _selector_used(selector, used):
+    # Classes a selector excludes with :not() don't have to be present
+    selector = _NOT.sub("", _STRING.sub("", selector))
+    for name in _CLASS.findall(selector):
+        if re.sub(r"\\(.)", r"\1", name) not in used:
+            return False
+    return True
+
+
+def purge(nodes, used):
+    """Drop the rules whose selectors need a class that isn't used
+
+    Selector lists keep only their used selectors. Rules nested inside a
+    kept rule (e.g. "&:hover") are kept with it, and block at-rules that
+    end up empty are dropped.
+    """
+    kept = []
+    for node in nodes:
+        if node[0] != "block":
+            kept.append(node)
+            continue
+
+        _, prelude, children = node
+        if prelude.startswith("@"):
+            had_rules = any(child[0] == "block" for child in children)
+            children = purge(children, used)
+            if children or not had_rules:
+                kept.append(("block", prelude, children))
+            continue
+
+        selectors = [s for s in _split_selectors(prelude) if _selector_used(s, used)]
+        if selectors:
+            kept.append(("block", ",".join(selectors), children))
+    return kept
+
+
+# Minifying ----------------------------------------------------------------
+
+def _outside_strings(text, func):
+    parts = _STRING.split(text)
+    return "".join(part if i % 2 else func(part) for i, part in enumerate(parts))
+
+
+def _minify_selector(text):
+    def squeeze(part):
+        part = re.sub(r"\s+", " ", part)
+        return re.sub(r"\s*([>+~,])\s*", r"\1", part)
+    return _outside_strings(text, squeeze).strip()
+
+
+def _minify_prelude(text):
+    return _outside_strings(text, lambda part: re.sub(r"\s+", " ", part)).strip()
+
+
+def _minify_declaration(text):
+    name, _, value = text.partition(":")
+    if name.startswith("--"):
+        # Custom property values are kept as written apart from whitespace; an empty one stays valid
+        return f"{name.strip()}:{_minify_prelude(value) or ' '}"
+
+    def squeeze(part):
+        part = re.sub(r"\s+", " ", part)
+        return re.sub(r"\s*,\s*", ",", part)
+    return f"{name.strip()}:{_outside_strings(value, squeeze).strip()}"
+
+
+def serialize(nodes):
+    """Write a node tree back out as minified CSS"""
+    out = []
+    for node in nodes:
+        kind = node[0]
+        if kind == "comment":
+            out.append(node[1] + "\n")
+        elif kind == "stmt":
+            out.append(_minify_prelude(node[1]) + ";")
+        elif kind == "decl":
+            out.append(_minify_declaration(node[1]) + ";")
+        else:
+            _, prelude, children = node
+            head = _minify_prelude(prelude) if prelude.startswith("@") else _minify_selector(prelude)
+            body = serialize(children)
+            if body.endswith(";"):
+                body = body[:-1]
+            out.append(f"{head}{{{body}}}")
+    return "".join(out)
+
+
+# Building -----------------------------------------------------------------
+
+def _fingerprint(relative_path, content):
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    stem, ext = posixpath.splitext(relative_path)
+    return f"{stem}.{digest}{ext}"
+
+
+def _precompress(path, content):
+    """Write .gz/.br siblings where they are smaller; return the encodings written"""
+    encodings = []
+    if not path.endswith(COMPRESSIBLE):
+        return encodings
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    if brotli is not None:
+        compressed = brotli.compress(content, quality=11)
+        if len(compressed) < len(content):
+            with open(path + ENCODINGS["br"], "wb") as f:
+                f.write(compressed)
+            encodings.append("br")
+
+    compressed = gzip.compress(content, compresslevel=9, mtime=0)
+    if len(compressed) < len(content):
+        with open(path + ENCODINGS["gzip"], "wb") as f:
+            f.write(compressed)
+        encodings.append("gzip")
+
+    return encodings
+
+
+class _Build:
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.dist = os.path.join(static_folder, DIST_DIR)
+        self.files = {}
+
+    def emit(self, relative_path, content):
+        """Write content under its hashed name and record it in the manifest"""
+        if relative_path in self.files:
+            return self.files[relative_path]["file"]
+
+        hashed = _fingerprint(relative_path, content)
+        path = os.path.join(self.dist, *hashed.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+        self.files[relative_path] = {
+            "file": hashed,
+            "size": len(content),
+            "encodings": _precompress(path, content),
+        }
+        return hashed
+
+    def rewrite_urls(self, css, relative_path):
+        """Point url(...) references at the hashed copies of local files"""
+        base = posixpath.dirname(relative_path)
+
+        def replace(match):
+            quote, target = match.groups()
+            if re.match(r"^(data:|[a-z]+:|//|/|#)", target):
+                return match.group(0)
+
+            path, suffix = re.match(r"^([^?#]*)(.*)$", target).groups()
+            source = posixpath.normpath(posixpath.join(base, path))
+            full = os.path.join(self.static_folder, *source.split("/"))
+            if not os.path.isfile(full):
+                return match.group(0)
+
+            with open(full, "rb") as f:
+                hashed = self.emit(source, f.read())
+            new_target = posixpath.relpath(hashed, posixpath.dirname(relative_path))
+            return f"url({quote}{new_target}{suffix}{quote})"
+
+        return _URL.sub(replace, css)
+
+
+def build(static_folder, template_folder, extra_sources=(), safelist=()):
+    """Build static/dist and its manifest; return the manifest"""
+    sources = []
+    for folder in (template_folder, *extra_sources):
+        for root, _, names in os.walk(folder):
+            sources.extend(os.path.join(root, name) for name in names if name.endswith((".html", ".js", ".py")))
+    used = used_tokens(sources) | set(safelist)
+
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.makedirs(dist)
+    assets = _Build(static_folder)
+
+    for root, dirs, names in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist]
+        for name in sorted(names):
+            if not name.endswith(".css"):
+                continue
+            full = os.path.join(root, name)
+            relative_path = os.path.relpath(full, static_folder).replace(os.sep, "/")
+            with open(full, encoding="utf-8") as f:
+                css = serialize(purge(parse_css(f.read()), used))
+            assets.emit(relative_path, assets.rewrite_urls(css, relative_path).encode("utf-8"))
+
+    manifest = {"files": assets.files}
+    with open(os.path.join(dist, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+# Serving ------------------------------------------------------------------
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _pick_encoding(encodings):
+    accepted = request.accept_encodings
+    for encoding in ENCODINGS:
+        if encoding in encodings and accepted.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def init_app(app):
+    """Serve the built assets, if `python -m iris.assets` has been run"""
+    manifest = load_manifest(app.static_folder)
+    if not manifest:
+        return
+
+    files = manifest["files"]
+    hashed = {f"{DIST_DIR}/{entry['file']}": entry for entry in files.values()}
+    send_static_file = app.view_functions["static"]
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == "static":
+            entry = files.get(values.get("filename"))
+            if entry is not None:
+                values["filename"] = f"{DIST_DIR}/{entry['file']}"
+
+    def static(filename):
+        entry = hashed.get(filename)
+        if entry is None:
+            return send_static_file(filename=filename)
+
+        encoding = _pick_encoding(entry["encodings"])
+        path = filename + ENCODINGS[encoding] if encoding else filename
+        response = send_from_directory(
+            app.static_folder,
+            path,
+            mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            max_age=ASSET_MAX_AGE,
+        )
+        response.cache_control.immutable = True
+        response.cache_control.public = True
+        if entry["encodings"]:
+            response.vary.add("Accept-Encoding")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+    app.view_functions["static"] = static
+
+
+def main():
+    package = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Build the fingerprinted, precompressed static assets")
+    parser.add_argument("--static", default=os.path.join(package, "static"))
+    parser.add_argument("--templates", default=os.path.join(package, "templates"))
+    parser.add_argument("--safelist", action="append", default=[], help="class to keep even if unused (repeatable)")
+    args = parser.parse_args()
+
+    manifest = build(args.static, args.templates, extra_sources=[package], safelist=args.safelist)
+    for name, entry in sorted(manifest["files"].items()):
+        source = os.path.join(args.static, *name.split("/"))
+        print(f"{name}: {os.path.getsize(source)} -> {entry['size']} bytes ({entry['file']}, {', '.join(entry['encodings']) or 'uncompressed'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+from collections import OrderedDict
+from .tokens import token_identity
+import base64
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Response cache backend: "memory" (per worker), "sqlite" (shared by all workers) or "off".
+# Writes invalidate only this worker's memory cache; other workers serve their
+# entries until the TTL runs out, so use "sqlite" where that matters.
+API_CACHE = os.getenv("API_CACHE", "memory").lower()
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "2048"))
+API_CACHE_PATH = os.getenv("API_CACHE_PATH", "/tmp/iris-api-cache.sqlite3")
+# Seconds to keep entries that have an ETag/Last-Modified after their TTL, for conditional GETs
+API_CACHE_REVALIDATE_TTL = int(os.getenv("API_CACHE_REVALIDATE_TTL", "3600"))
+
+# Seconds to keep GET responses, by endpoint prefix (the longest matching prefix wins)
+CACHE_TTLS = {
+    "/users/": 300,
+    "/standups/": 60,
+    "/sessions/": 30,
+    "/responses/": 10,
+}
+
+_ID_SEGMENT = re.compile(r"^(.*/)\d+/?$")
+
+
+class MemoryBackend:
+    """In-process LRU store, private to one worker"""
+
+    def __init__(self, max_entries=API_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _to_json(value):
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Can't cache a {type(value).__name__}")
+
+
+def _from_json(value):
+    if len(value) == 1 and "__bytes__" in value:
+        return base64.b64decode(value["__bytes__"])
+    return value
+
+
+class SQLiteBackend:
+    """Store in a SQLite file so every worker on the host shares one cache
+
+    Values are stored as JSON (bytes as base64), so a row that someone else
+    wrote to the file is at worst a wrong cache entry, never code to run.
+    """
+
+    def __init__(self, path=API_CACHE_PATH, max_entries=API_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0  # by this worker
+        self._local = threading.local()
+
+    def _connect(self):
+        # Connections can't cross threads or a fork, so keep one per thread per process
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS api_cache ("
+                "key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS api_cache_accessed ON api_cache (accessed)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value FROM api_cache WHERE key = ? AND expires >= ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            value = json.loads(row[0], object_hook=_from_json)
+        except ValueError:
+            # Not written by this backend (or by an older, pickling one)
+            conn.execute("DELETE FROM api_cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE api_cache SET accessed = ? WHERE key = ?", (now, key))
+        return value
+
+    def set(self, key, value, ttl):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO api_cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value, default=_to_json, separators=(",", ":")), now + ttl, now)
+        )
+        self.evictions += conn.execute(
+            "DELETE FROM api_cache WHERE key IN ("
+            "SELECT key FROM api_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+
+    def delete_prefix(self, prefix):
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        self._connect().execute(
+            "DELETE FROM api_cache WHERE key LIKE ? ESCAPE '\\'", (escaped + "%",)
+        )
+
+    def clear(self):
+        self._connect().execute("DELETE FROM api_cache")
+
+
+class ResponseCache:
+    """TTL cache for GET responses, keyed by endpoint, params and user
+
+    Entries are dicts holding the response and its decoded JSON body. Those
+    with an ETag or Last-Modified validator outlive their TTL by
+    API_CACHE_REVALIDATE_TTL so a stale entry can be revalidated with a
+    conditional GET instead of being downloaded and parsed again.
+    """
+
+    def __init__(self, backend, ttls=None):
+        self.backend = backend
+        self.ttls = CACHE_TTLS if ttls is None else ttls
+        self._prefixes = sorted(self.ttls, key=len, reverse=True)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _group(self, endpoint):
+        for prefix in self._prefixes:
+            if endpoint.startswith(prefix):
+                return prefix
+        return None
+
+    def _count(self, group, name, value=1):
+        with self._lock:
+            counters = self._stats.setdefault(group, {
+                "hits": 0,
+                "misses": 0,
+                "stores": 0,
+                "revalidated": 0,
+                "bytes_saved": 0,
+                "parse_time_saved": 0.0,
+            })
+            counters[name] += value
+
+    @staticmethod
+    def make_key(endpoint, params, token):
+        query = "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+        return f"{endpoint}|{query}|{token_identity(token)}"
+
+    def get(self, endpoint, params, token):
+        """Return (entry, fresh) for a cached GET, or (None, False) on a miss
+
+        A stale entry is still returned so its validators can be sent.
+        """
+        group = self._group(endpoint)
+        if group is None:
+            return None, False
+
+        entry = self.backend.get(self.make_key(endpoint, params, token))
+        fresh = entry is not None and entry["fresh_until"] >= time.time()
+        self._count(group, "hits" if fresh else "misses")
+        return entry, fresh
+
+    def set(self, endpoint, params, token, entry):
+        group = self._group(endpoint)
+        if group is None:
+            return
+
+        ttl = self.ttls[group]
+        entry["fresh_until"] = time.time() + ttl
+        if entry.get("etag") or entry.get("last_modified"):
+            ttl += API_CACHE_REVALIDATE_TTL
+
+        self.backend.set(self.make_key(endpoint, params, token), entry, ttl)
+        self._count(group, "stores")
+
+    def revalidated(self, endpoint, params, token, entry):
+        """Extend a stale entry after the API answered 304 Not Modified"""
+        group = self._group(endpoint)
+        self.set(endpoint, params, token, entry)
+        self._count(group, "revalidated")
+        self._count(group, "bytes_saved", len(entry["content"]))
+        self._count(group, "parse_time_saved", entry.get("parse_time", 0.0))
+
+    def invalidate(self, *endpoints):
+        """Drop cached responses for these endpoints, for every user"""
+        for endpoint in endpoints:
+            self.backend.delete_prefix(f"{endpoint}|")
+
+    def invalidate_for_write(self, endpoint, data=None):
+        """Drop everything a successful POST/PUT/DELETE on endpoint may have changed
+
+        With the memory backend that's only this worker's copy; see API_CACHE.
+        """
+        endpoints = {endpoint}
+
+        # /standups/5 also changes the /standups/ listing
+        match = _ID_SEGMENT.match(endpoint)
+        if match:
+            endpoints.add(match.group(1))
+
+        # New sessions and responses change their parent's listings
+        if isinstance(data, dict):
+            if data.get("standup_id") is not None:
+                endpoints.add(f"/sessions/standup/{data['standup_id']}")
+            if data.get("session_id") is not None:
+                endpoints.add(f"/responses/session/{data['session_id']}")
+                endpoints.add(f"/sessions/{data['session_id']}")
+
+        self.invalidate(*endpoints)
+
+    def stats(self):
+        """Return hit/miss/revalidation counters and hit ratio per endpoint group and overall
+
+        The overall counters also have the backend's LRU evictions.
+        """
+        with self._lock:
+            groups = {group: dict(counters) for group, counters in self._stats.items()}
+
+        total = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "revalidated": 0,
+            "bytes_saved": 0,
+            "parse_time_saved": 0.0,
+        }
+        for counters in groups.values():
+            for name in total:
+                total[name] += counters[name]
+
+        for counters in list(groups.values()) + [total]:
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_ratio"] = counters["hits"] / lookups if lookups else 0.0
+        total["evictions"] = self.backend.evictions
+
+        return {"total": total, "endpoints": groups}
+
+
+def create_cache(kind=API_CACHE):
+    """Build the response cache for the configured backend, or None when disabled"""
+    if kind == "off":
+        return None
+    if kind == "sqlite":
+        return ResponseCache(SQLiteBackend())
+    if kind == "memory":
+        return ResponseCache(MemoryBackend())
+    raise ValueError(f"Unknown API_CACHE backend: {kind}")
+
+
+response_cache = create_cache()
+
+
+def cache_stats():
+    """Return response cache hit ratios for this worker"""
+    if response_cache is None:
+        return {}
+    return response_cache.stats()
@@ -0,0 +1,185 @@
+from flask import request, session
+import gzip
+import hashlib
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compress dynamic responses with brotli or gzip when the browser accepts it
+COMPRESS = os.getenv("COMPRESS", "true").lower() == "true"
+# Responses smaller than this many bytes are sent as they are
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "500"))
+# gzip level (1-9) and brotli quality (0-11); higher is smaller but slower
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+# Add weak ETags to rendered pages and answer matching If-None-Match with 304
+HTTP_ETAGS = os.getenv("HTTP_ETAGS", "true").lower() == "true"
+
+COMPRESSIBLE_MIMETYPES = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/csv",
+    "text/event-stream",
+    "application/json",
+    "application/javascript",
+    "application/x-ndjson",
+    "image/svg+xml",
+}
+
+
+def _pick_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality("br") > 0:
+        return "br"
+    if accepted.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+class _StreamCompressor:
+    """Compress a streamed body chunk by chunk, flushing after each one
+
+    Flushing keeps every chunk decodable as soon as it arrives, so streamed
+    pages still render progressively.
+    """
+
+    def __init__(self, encoding, level, quality):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=quality)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk):
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def _compress_stream(chunks, compressor):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def compress_response(response, min_size=COMPRESS_MIN_SIZE, level=COMPRESS_LEVEL,
+                      quality=COMPRESS_BROTLI_QUALITY):
+    """Compress a response in place for the current request's Accept-Encoding"""
+    if (
+        response.status_code == 304
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and "no-transform" not in response.headers.get("Cache-Control", "")
+    ):
+        # A 304 carries the Vary of the response it stands for
+        response.vary.add("Accept-Encoding")
+        return response
+
+    if (
+        response.direct_passthrough
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or response.status_code < 200
+        or response.status_code in (204, 206)
+        or "Content-Encoding" in response.headers
+        or "no-transform" in response.headers.get("Cache-Control", "")
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _pick_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        compressor = _StreamCompressor(encoding, level, quality)
+        response.response = _compress_stream(response.response, compressor)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=quality)
+        else:
+            compressed = gzip.compress(data, compresslevel=level, mtime=0)
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def add_etag(response):
+    """Give a rendered 200 response a weak ETag and turn it into a 304 when it matches
+
+    The tag is a hash of the uncompressed body, so it is the same for every
+    encoding of the page; a weak tag says the representations are
+    equivalent rather than byte-identical.
+    """
+    if (
+        request.method not in ("GET", "HEAD")
+        or response.status_code != 200
+        or response.is_streamed
+        or response.direct_passthrough
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or "ETag" in response.headers
+    ):
+        return response
+
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest()[:32], weak=True)
+    return response.make_conditional(request)
+
+
+def init_app(app):
+    """Register the ETag and compression hook
+
+    Call this before the other init_app()s: after_request hooks run in
+    reverse order, so this one then sees the final body.
+    """
+    app.config.setdefault("COMPRESS", COMPRESS)
+    app.config.setdefault("COMPRESS_MIN_SIZE", COMPRESS_MIN_SIZE)
+    app.config.setdefault("COMPRESS_LEVEL", COMPRESS_LEVEL)
+    app.config.setdefault("COMPRESS_BROTLI_QUALITY", COMPRESS_BROTLI_QUALITY)
+    app.config.setdefault("HTTP_ETAGS", HTTP_ETAGS)
+    if not (app.config["COMPRESS"] or app.config["HTTP_ETAGS"]):
+        return
+
+    @app.after_request
+    def finish_response(response):
+        # Pages built from the session differ per user: browsers may keep
+        # them but must revalidate, and shared caches must not serve them
+        if session.accessed:
+            response.vary.add("Cookie")
+            if "Cache-Control" not in response.headers:
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+
+        if app.config["HTTP_ETAGS"]:
+            response = add_etag(response)
+        if app.config["COMPRESS"]:
+            response = compress_response(
+                response,
+                app.config["COMPRESS_MIN_SIZE"],
+                app.config["COMPRESS_LEVEL"],
+                app.config["COMPRESS_BROTLI_QUALITY"],
+            )
+        return response
@@ -0,0 +1,188 @@
+from .helpers import api_request, iter_json_array, iter_pipeline
+from .timezones import convert_timezone
+from collections import deque
+from flask import Response, session, stream_with_context
+from iris import logger
+from itertools import chain, islice
+import csv
+import io
+import json
+import os
+
+# Sessions requested per page while an export walks a standup's history
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "100"))
+# Sessions whose responses are fetched at once during an export
+EXPORT_CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", "4"))
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Timestamps in exports are sortable and carry their UTC offset
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+COLUMNS = [
+    "session_id",
+    "session_date",
+    "session_completed",
+    "response_id",
+    "user_id",
+    "username",
+    "yesterday",
+    "today",
+    "blockers",
+    "submitted_at",
+]
+
+
+class ExportError(Exception):
+    """A backend call failed part way through an export"""
+
+
+def iter_sessions(standup_id, token, page_size=EXPORT_PAGE_SIZE):
+    """Yield every session of a standup, one page in memory at a time
+
+    Pages are asked for with one extra row, to tell if there is another.
+    If the API ignores the paging params the whole listing arrives in one
+    streamed response, which is read through once. That's noticed by
+    getting more rows than asked for or, when the listing has exactly one
+    page and its extra row, by the next page starting over with the first
+    session; then only the rows not yet yielded are.
+    """
+    offset = 0
+    first_id = None
+    while True:
+        response = api_request(
+            "get",
+            f"/sessions/standup/{standup_id}",
+            # Fetching responses may have refreshed the token
+            token=session.get("token", token),
+            params={"skip": offset, "limit": page_size + 1},
+            use_cache=False,
+            stream=True,
+        )
+        if response.status_code != 200:
+            response.close()
+            raise ExportError(f"Sessions of standup {standup_id} returned {response.status_code}")
+
+        rows = iter_json_array(response)
+        head = next(rows, None)
+        if head is None:
+            return
+        if offset and head.get("id") == first_id:
+            # The whole listing again: skip what was already yielded
+            yield from islice(rows, offset - 1, None)
+            return
+        if not offset:
+            first_id = head.get("id")
+
+        count = 0
+        extra = None
+        for standup_session in chain([head], rows):
+            count += 1
+            if count <= page_size:
+                yield standup_session
+            elif count == page_size + 1:
+                extra = standup_session
+            else:
+                # More rows than asked for: this is the whole listing
+                if extra is not None:
+                    yield extra
+                    extra = None
+                yield standup_session
+
+        if count != page_size + 1:
+            return
+        offset += page_size
+
+
+def export_rows(standup, token, timezone=None):
+    """Yield one dict per response to any of the standup's sessions, session by session
+
+    Responses to up to EXPORT_CONCURRENCY sessions are fetched at once,
+    and only those are held in memory. Timestamps are converted from UTC
+    to `timezone`, by default the standup's own.
+    """
+    timezone = timezone or standup.get("timezone") or "UTC"
+    sessions = iter_sessions(standup["id"], token)
+    # Each call remembers its session, so the rows can name it
+    fetched = deque()
+
+    def calls():
+        for standup_session in sessions:
+            fetched.append(standup_session)
+            yield ("get", f"/responses/session/{standup_session['id']}", {"use_cache": False})
+
+    for response in iter_pipeline(calls(), token=token, concurrency=EXPORT_CONCURRENCY):
+        standup_session = fetched.popleft()
+        if response.status_code != 200:
+            response.close()
+            raise ExportError(f"Responses to session {standup_session['id']} returned {response.status_code}")
+
+        session_date = convert_timezone(standup_session.get("date"), "UTC", timezone, TIMESTAMP_FORMAT)
+        for item in response.json():
+            user = item.get("user") or {}
+            yield {
+                "session_id": standup_session["id"],
+                "session_date": session_date,
+                "session_completed": standup_session.get("is_completed"),
+                "response_id": item.get("id"),
+                "user_id": item.get("user_id"),
+                "username": user.get("username"),
+                "yesterday": item.get("yesterday"),
+                "today": item.get("today"),
+                "blockers": item.get("blockers"),
+                "submitted_at": convert_timezone(item.get("created_at"), "UTC", timezone, TIMESTAMP_FORMAT),
+            }
+        # Sent per session, so compression and the socket see a few KB at a time
+        yield None
+
+
+def _csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        if row is not None:
+            writer.writerow(row)
+        elif buffer.tell():
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows):
+    lines = []
+    for row in rows:
+        if row is not None:
+            lines.append(json.dumps(row) + "\n")
+        elif lines:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+def export_response(standup, token, format="csv", timezone=None):
+    """Stream the standup's history as a CSV or NDJSON download
+
+    The body is produced as it's sent, so memory use doesn't grow with the
+    history. A failure part way through is logged and ends the response
+    early, leaving the client with a truncated transfer rather than a
+    silently incomplete file.
+    """
+    chunks = _csv_chunks if format == "csv" else _ndjson_chunks
+
+    def generate():
+        try:
+            yield from chunks(export_rows(standup, token, timezone))
+        except ExportError as e:
+            logger.error(f"Export of standup {standup['id']} failed: {str(e)}")
+            raise
+
+    response = Response(stream_with_context(generate()), mimetype=FORMATS[format])
+    response.headers["Content-Disposition"] = f'attachment; filename="standup-{standup["id"]}.{format}"'
+    return response
@@ -1,54 +1,567 @@
+from . import cache, identity, instrumentation, metrics
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from flask import flash, redirect, session, url_for
 from functools import wraps
+from iris import logger
+from iris.tokens import token_expiry
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+import codecs
+import contextvars
+import json
 import os
 import requests
+import threading
+import time
 
 # API URL from environment variable or default for development
 API_URL = os.getenv("API_URL")
 
+# Connection pool settings for the shared backend client
+API_POOL_CONNECTIONS = int(os.getenv("API_POOL_CONNECTIONS", "4"))  # number of per-host pools kept
+API_POOL_MAXSIZE = int(os.getenv("API_POOL_MAXSIZE", "20"))  # keep-alive connections per host
+API_POOL_BLOCK = os.getenv("API_POOL_BLOCK", "false").lower() == "true"  # wait instead of exceeding maxsize
+API_KEEPALIVE = os.getenv("API_KEEPALIVE", "true").lower() == "true"
+
+# Timeouts (seconds) and retry policy for backend calls
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3.05"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "10"))
+API_RETRIES = int(os.getenv("API_RETRIES", "2"))
+API_RETRY_BACKOFF = float(os.getenv("API_RETRY_BACKOFF", "0.3"))
+
+# Upper bound on concurrent backend calls made by api_batch in one worker
+API_BATCH_WORKERS = int(os.getenv("API_BATCH_WORKERS", "8"))
+
+# How the serving workers run requests: "sync" (one thread each) or "gevent" (green threads)
+SERVING_MODE = os.getenv("SERVING_MODE", "sync").lower()
+# With gevent a worker has many requests in flight, so it gets a bigger, blocking pool
+API_GEVENT_POOL_MAXSIZE = int(os.getenv("API_GEVENT_POOL_MAXSIZE", "100"))
+
+# Per-endpoint circuit breaker: it opens when, over the last API_BREAKER_WINDOW seconds, at least
+# API_BREAKER_MIN_CALLS calls were made and API_BREAKER_FAILURE_RATE of them failed (5xx, timeout, no connection)
+API_BREAKER = os.getenv("API_BREAKER", "true").lower() == "true"
+API_BREAKER_WINDOW = float(os.getenv("API_BREAKER_WINDOW", "30"))
+API_BREAKER_MIN_CALLS = int(os.getenv("API_BREAKER_MIN_CALLS", "10"))
+API_BREAKER_FAILURE_RATE = float(os.getenv("API_BREAKER_FAILURE_RATE", "0.5"))
+# Seconds an open breaker refuses calls, then how many probe calls it lets through
+API_BREAKER_COOLDOWN = float(os.getenv("API_BREAKER_COOLDOWN", "15"))
+API_BREAKER_PROBES = int(os.getenv("API_BREAKER_PROBES", "1"))
+
+# Backend calls one worker may have in flight (0: the connection pool size); callers
+# over the limit wait up to API_ADMISSION_TIMEOUT seconds and are then refused
+API_MAX_IN_FLIGHT = int(os.getenv("API_MAX_IN_FLIGHT", "0"))
+API_ADMISSION_TIMEOUT = float(os.getenv("API_ADMISSION_TIMEOUT", "0.5"))
+
+# Access tokens are refreshed this many seconds before their exp claim
+TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", "60"))
+# Seconds a refresh result is handed to requests still presenting the old refresh token
+TOKEN_REFRESH_REUSE = int(os.getenv("TOKEN_REFRESH_REUSE", "30"))
+
+SUPPORTED_METHODS = ("get", "post", "put", "delete")
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+_executor = None
+_executor_pid = None
+_serving_mode = SERVING_MODE
+
+_refreshes = {}  # refresh token -> _Refresh
+_refresh_lock = threading.Lock()
+
+_breakers = {}  # endpoint label -> CircuitBreaker
+_breakers_lock = threading.Lock()
+
+
+def _build_client():
+    """Create a requests session with a tuned, retrying connection pool"""
+    retry = Retry(
+        total=API_RETRIES,
+        connect=API_RETRIES,
+        read=False,  # a read timeout already cost a full API_READ_TIMEOUT, surface it as 504
+        backoff_factor=API_RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(["GET", "PUT", "DELETE"]),  # POST is not idempotent
+        raise_on_status=False,
+    )
+    green = _serving_mode == "gevent"
+    adapter = HTTPAdapter(
+        pool_connections=API_POOL_CONNECTIONS,
+        pool_maxsize=API_GEVENT_POOL_MAXSIZE if green else API_POOL_MAXSIZE,
+        pool_block=True if green else API_POOL_BLOCK,
+        max_retries=retry,
+    )
+    client = requests.Session()
+    client.mount("http://", adapter)
+    client.mount("https://", adapter)
+    client.headers["Connection"] = "keep-alive" if API_KEEPALIVE else "close"
+    return client
+
+
+def get_client():
+    """Return the shared HTTP client for this worker process
+
+    Sockets must not be shared across a fork (gunicorn --preload), so a new
+    client is built the first time it's used in each process.
+    """
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = _build_client()
+                _client_pid = pid
+    return _client
+
+
+def pool_stats():
+    """Return connection pool hit/miss counters for this worker"""
+    stats = {"requests": 0, "hits": 0, "misses": 0, "pools": 0}
+    if _client is None or _client_pid != os.getpid():
+        return stats
+
+    for adapter in set(_client.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats["pools"] += 1
+            stats["requests"] += pool.num_requests
+            stats["misses"] += pool.num_connections
+
+    stats["hits"] = max(0, stats["requests"] - stats["misses"])
+    return stats
+
+
+def warm_pool(connections=1):
+    """Open keep-alive connections to the API before a request needs them; return how many answered"""
+    client = get_client()
+
+    def connect():
+        try:
+            client.head(API_URL, timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT))
+            return True
+        except requests.RequestException:
+            return False
+
+    # At the same time, so each one gets its own connection
+    waits = [_submit(connect) for _ in range(connections)]
+    return sum(wait() for wait in waits)
+
+
+class CircuitBreaker:
+    """Fail fast for one backend endpoint while most of its recent calls fail
+
+    Closed, call outcomes are counted in a sliding window split into
+    `buckets` slots. Once the window holds at least min_calls calls and
+    failure_rate of them failed, the breaker opens and refuses calls for
+    `cooldown` seconds. It is then half-open: up to `probes` calls go
+    through, and the first of their outcomes closes it again or reopens it.
+    Calls let through before that are ignored while it is half-open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, window=API_BREAKER_WINDOW, min_calls=API_BREAKER_MIN_CALLS,
+                 failure_rate=API_BREAKER_FAILURE_RATE, cooldown=API_BREAKER_COOLDOWN,
+                 probes=API_BREAKER_PROBES, buckets=10):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.probes = probes
+        self.buckets = buckets
+        self.bucket_seconds = window / buckets
+        self.state = self.CLOSED
+        self._window = deque()  # [bucket number, calls, failures], oldest first
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._tickets = 0
+        self._probe_tickets = set()
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.breaker_transition(self.name, state)
+        if state == self.OPEN:
+            logger.warning(f"Circuit breaker for {self.name} opened")
+
+    def allow(self):
+        """Return a ticket for a call that may go to the backend now, or None
+
+        The ticket is handed back to record() with the call's outcome.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    return None
+                self._set_state(self.HALF_OPEN)
+                self._probes_started = 0
+
+            self._tickets += 1
+            if self.state == self.HALF_OPEN:
+                if self._probes_started >= self.probes:
+                    return None
+                self._probes_started += 1
+                self._probe_tickets.add(self._tickets)
+            return self._tickets
+
+    def record(self, ticket, failed):
+        """Count the outcome of a call that allow() let through with ticket"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                if ticket not in self._probe_tickets:
+                    # Let through while closed: it says nothing about the recovery
+                    return
+                self._probe_tickets.clear()
+                if failed:
+                    self._open(now)
+                else:
+                    self._window.clear()
+                    self._set_state(self.CLOSED)
+                return
+            if self.state == self.OPEN:
+                # Started before the breaker opened
+                return
+
+            bucket = int(now // self.bucket_seconds)
+            while self._window and self._window[0][0] <= bucket - self.buckets:
+                self._window.popleft()
+            if not self._window or self._window[-1][0] != bucket:
+                self._window.append([bucket, 0, 0])
+            self._window[-1][1] += 1
+            self._window[-1][2] += int(failed)
+
+            calls = sum(slot[1] for slot in self._window)
+            failures = sum(slot[2] for slot in self._window)
+            if calls >= self.min_calls and failures >= calls * self.failure_rate:
+                self._open(now)
+
+    def _open(self, now):
+        self._opened_at = now
+        self._window.clear()
+        self._probe_tickets.clear()
+        self._set_state(self.OPEN)
+
+
+def get_breaker(endpoint):
+    """Return the circuit breaker shared by every call to an endpoint (ids collapsed)"""
+    name = metrics.endpoint_label(endpoint)
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+
+def breaker_states():
+    """Return {endpoint: state} for every breaker in this worker"""
+    return {name: breaker.state for name, breaker in list(_breakers.items())}
+
+
+def _admission_limit(mode):
+    if API_MAX_IN_FLIGHT > 0:
+        return API_MAX_IN_FLIGHT
+    return API_GEVENT_POOL_MAXSIZE if mode == "gevent" else API_POOL_MAXSIZE
+
+
+# Bounds this worker's in-flight backend calls; rebuilt by configure_concurrency()
+_admission = threading.BoundedSemaphore(_admission_limit(SERVING_MODE))
+
+
+def _error_response(status, detail):
+    """A synthetic error response; like a read one, it is safe to close()"""
+    mock_response = requests.Response()
+    mock_response.status_code = status
+    mock_response._content = json.dumps({"detail": detail}).encode("utf-8")
+    mock_response._content_consumed = True
+    return mock_response
+
+
+def _refused_response(entry, url, status, detail):
+    """Serve the stale cached copy of a GET if there is one, else a synthetic error"""
+    if entry is not None:
+        metrics.cache_lookup("stale")
+        return CachedResponse(entry, url)
+    return _error_response(status, detail)
+
+
+class CachedResponse(requests.Response):
+    """Response rebuilt from the cache whose json() reuses the stored decoded body
+
+    The decoded body is shared between requests, so callers must treat it as
+    read-only.
+    """
+
+    def __init__(self, entry, url):
+        super().__init__()
+        self.status_code = entry["status_code"]
+        self.headers = CaseInsensitiveDict(entry["headers"])
+        self.encoding = entry["encoding"]
+        self.url = url
+        self._content = entry["content"]
+        self._content_consumed = True
+        self._entry = entry
+
+    def json(self, **kwargs):
+        if self._entry["decoded"] is not None and not kwargs:
+            return self._entry["decoded"][0]
+        return super().json(**kwargs)
+
+
+def _cache_entry(response):
+    """Build a cache entry with validators and the decoded JSON body"""
+    decoded = None
+    parse_time = 0.0
+    if "json" in response.headers.get("Content-Type", ""):
+        start = time.perf_counter()
+        try:
+            decoded = (response.json(),)
+        except ValueError:
+            pass
+        parse_time = time.perf_counter() - start
+        instrumentation.record("json", parse_time)
+
+    return {
+        "status_code": response.status_code,
+        "headers": dict(response.headers),
+        "encoding": response.encoding,
+        "content": response.content,
+        "decoded": decoded,
+        "parse_time": parse_time,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
 
 # Helper function to make authenticated API requests
-def api_request(method, endpoint, data=None, token=None, params=None):
-    headers = {}
+def api_request(method, endpoint, data=None, token=None, params=None, form=None, use_cache=True,
+                stream=False, headers=None):
+    headers = dict(headers or {})
     if token:
         headers["Authorization"] = f"Bearer {token}"
     
     url = f"{API_URL}{endpoint}"
+    response_cache = cache.response_cache if use_cache else None
+    entry = None
     
     try:
-        if method.lower() == "get":
-            response = requests.get(url, headers=headers, params=params, timeout=10)
-        elif method.lower() == "post":
-            response = requests.post(url, json=data, headers=headers, timeout=10)
-        elif method.lower() == "put":
-            response = requests.put(url, json=data, headers=headers, timeout=10)
-        elif method.lower() == "delete":
-            response = requests.delete(url, headers=headers, timeout=10)
-        else:
+        method = method.lower()
+        if method not in SUPPORTED_METHODS:
             raise ValueError(f"Unsupported HTTP method: {method}")
+
+        if method == "get" and response_cache is not None:
+            entry, fresh = response_cache.get(endpoint, params, token)
+            if fresh:
+                instrumentation.record("cache", 0.0)
+                metrics.cache_lookup("hit")
+                return CachedResponse(entry, url)
+            
+            # Stale but revalidatable: ask the API whether it changed
+            if entry is not None:
+                if entry["etag"]:
+                    headers["If-None-Match"] = entry["etag"]
+                if entry["last_modified"]:
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+        # Fail fast, with the stale cached copy if there is one, when the
+        # worker already has too many calls waiting or the endpoint is failing
+        admission = _admission
+        if not admission.acquire(timeout=API_ADMISSION_TIMEOUT):
+            metrics.backend_failure(method, endpoint, "overloaded")
+            return _refused_response(entry, url, 503, "Service busy. Too many API requests are in flight.")
+        try:
+            breaker = get_breaker(endpoint) if API_BREAKER else None
+            ticket = breaker.allow() if breaker is not None else None
+            if breaker is not None and ticket is None:
+                metrics.backend_failure(method, endpoint, "circuit_open")
+                return _refused_response(entry, url, 503, "Service unavailable. The API is failing, try again shortly.")
+
+            failed = True
+            try:
+                start = time.perf_counter()
+                response = get_client().request(
+                    method,
+                    url,
+                    headers=headers,
+                    params=params if method == "get" else None,
+                    json=data if method in ("post", "put") and form is None else None,
+                    data=form,
+                    timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT),
+                    stream=stream,
+                )
+                failed = response.status_code >= 500
+            finally:
+                if breaker is not None:
+                    breaker.record(ticket, failed)
+        finally:
+            admission.release()
+        duration = time.perf_counter() - start
+        instrumentation.record_call(endpoint, duration)
+        metrics.observe_backend(method, endpoint, response.status_code, duration)
+        
+        if response_cache is not None:
+            if method == "get" and response.status_code == 304 and entry is not None:
+                # Hand the (possibly streamed) connection back to the pool
+                response.close()
+                response_cache.revalidated(endpoint, params, token, entry)
+                metrics.cache_lookup("revalidated")
+                return CachedResponse(entry, url)
+            elif method == "get" and response.status_code == 200 and not stream:
+                entry = _cache_entry(response)
+                response_cache.set(endpoint, params, token, entry)
+                metrics.cache_lookup("miss")
+                return CachedResponse(entry, url)
+            elif method != "get" and 200 <= response.status_code < 300:
+                response_cache.invalidate_for_write(endpoint, data if form is None else form)
         
         return response
     
     except requests.exceptions.ConnectionError:
-        # Create a mock response for connection errors
-        mock_response = requests.Response()
-        mock_response.status_code = 503
-        mock_response._content = b'{"detail": "Service unavailable. Could not connect to the API."}'
-        return mock_response
+        metrics.backend_failure(method, endpoint, "connection_error")
+        if entry is not None:
+            metrics.cache_lookup("stale")
+            return CachedResponse(entry, url)
+        return _error_response(503, "Service unavailable. Could not connect to the API.")
     
     except requests.exceptions.Timeout:
-        # Create a mock response for timeouts
-        mock_response = requests.Response()
-        mock_response.status_code = 504
-        mock_response._content = b'{"detail": "Request timed out. The API is taking too long to respond."}'
-        return mock_response
+        metrics.backend_failure(method, endpoint, "timeout")
+        if entry is not None:
+            metrics.cache_lookup("stale")
+            return CachedResponse(entry, url)
+        return _error_response(504, "Request timed out. The API is taking too long to respond.")
     
     except Exception as e:
-        # Create a mock response for other exceptions
-        mock_response = requests.Response()
-        mock_response.status_code = 500
-        mock_response._content = f'{{"detail": "An error occurred: {str(e)}"}}'.encode('utf-8')
-        return mock_response
+        metrics.backend_failure(method, endpoint, "error")
+        return _error_response(500, f"An error occurred: {str(e)}")
+
+
+def iter_json_array(response, chunk_size=65536):
+    """Yield the items of a JSON array response as they are downloaded
+
+    Use with api_request(..., stream=True) so a large listing is never held
+    in memory as a whole. Responses that are already in memory (e.g. served
+    from the cache) are iterated directly. The response is closed once the
+    iteration finishes or is abandoned.
+    """
+    if isinstance(response, CachedResponse) or not response.raw:
+        body = response.json()
+        yield from body if isinstance(body, list) else []
+        return
+
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+    buffer = ""
+    started = False
+    finished = False
+
+    try:
+        chunks = response.iter_content(chunk_size=chunk_size)
+        while not finished:
+            chunk = next(chunks, None)
+            done = chunk is None
+            buffer += text.decode(chunk or b"", final=done)
+            pos = 0
+
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos == len(buffer):
+                    break
+
+                if not started:
+                    if buffer[pos] != "[":
+                        # Not an array: nothing to stream
+                        finished = True
+                        break
+                    started = True
+                    pos += 1
+                    continue
+
+                if buffer[pos] == "]":
+                    finished = True
+                    break
+
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    if done:
+                        raise
+                    break
+
+                # A bare number at the end of the buffer may continue in the next chunk
+                if end == len(buffer) and not done:
+                    break
+
+                yield item
+                pos = end
+
+            buffer = buffer[pos:]
+            if done:
+                break
+    finally:
+        response.close()
+
+
+class _Refresh:
+    """A token refresh shared by every request presenting the same refresh token"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.token_data = None
+        self.finished = None
+
+
+def _shared_refresh(token):
+    """Exchange a refresh token, at most once at a time per worker
+
+    Threads and greenlets that ask while a refresh is in flight wait for it,
+    and a successful result is reused for TOKEN_REFRESH_REUSE seconds so
+    other tabs holding the same (possibly rotated) refresh token get it too.
+    Returns the token response data, or None if the refresh failed.
+    """
+    now = time.monotonic()
+    with _refresh_lock:
+        for key, call in list(_refreshes.items()):
+            if call.finished is not None and now - call.finished > TOKEN_REFRESH_REUSE:
+                del _refreshes[key]
+
+        call = _refreshes.get(token)
+        leader = call is None
+        if leader:
+            call = _refreshes[token] = _Refresh()
+
+    if not leader:
+        metrics.token_refresh_shared()
+        call.done.wait(API_CONNECT_TIMEOUT + API_READ_TIMEOUT)
+        return call.token_data
+
+    try:
+        response = api_request("post", "/token/refresh", form={"refresh_token": token})
+        if response.status_code == 200:
+            token_data = response.json()
+            if "access_token" in token_data:
+                call.token_data = token_data
+    except Exception:
+        pass
+    finally:
+        with _refresh_lock:
+            call.finished = time.monotonic()
+            # Failures aren't reused, the next request tries again
+            if call.token_data is None:
+                _refreshes.pop(token, None)
+        call.done.set()
+
+    metrics.token_refresh(call.token_data is not None)
+    return call.token_data
 
 
 def refresh_token():
@@ -56,23 +569,36 @@ def refresh_token():
     if "refresh_token" not in session:
         return False
     
-    try:
-        response = requests.post(
-            f"{API_URL}/token/refresh",
-            data={"refresh_token": session["refresh_token"]}
-        )
-        
-        if response.status_code == 200:
-            token_data = response.json()
-            session["token"] = token_data["access_token"]
-            if "refresh_token" in token_data:
-                session["refresh_token"] = token_data["refresh_token"]
-            return True
-        
-    except:
-        pass
+    start = time.perf_counter()
+    token_data = _shared_refresh(session["refresh_token"])
+    instrumentation.record("refresh", time.perf_counter() - start)
+    
+    if token_data is None:
+        return False
     
-    return False
+    session["token"] = token_data["access_token"]
+    if "refresh_token" in token_data:
+        session["refresh_token"] = token_data["refresh_token"]
+    return True
+
+
+def exchange_refresh_token(refresh_token):
+    """Refresh outside a request (e.g. in a background worker); return the token data or None
+
+    The exchange is shared like any other, so the user's own next request
+    presenting the same refresh token within TOKEN_REFRESH_REUSE seconds
+    gets the same result rather than a rejected, rotated-out token.
+    """
+    if not refresh_token:
+        return None
+    return _shared_refresh(refresh_token)
+
+
+def refresh_if_expiring():
+    """Refresh the access token ahead of its exp claim to avoid a 401 round trip"""
+    expiry = token_expiry(session.get("token"))
+    if expiry is not None and expiry - time.time() <= TOKEN_REFRESH_MARGIN:
+        refresh_token()
 
 
 def api_request_with_refresh(method, endpoint, data=None, token=None, params=None):
@@ -86,13 +612,212 @@ def api_request_with_refresh(method, endpoint, data=None, token=None, params=Non
     return response
 
 
+def configure_concurrency(mode):
+    """Select the concurrency model backend calls are made with
+
+    "sync" runs concurrent calls on a thread pool. "gevent" runs them as
+    greenlets and sizes the connection pool for many in-flight requests;
+    it needs a gevent gunicorn worker (or gevent.monkey.patch_all()) so
+    sockets yield to other greenlets.
+    """
+    global _serving_mode, _client, _executor, _admission
+
+    if mode not in ("sync", "gevent"):
+        raise ValueError(f"Unknown serving mode: {mode}")
+
+    if mode == "gevent":
+        from gevent import monkey
+        if not monkey.is_module_patched("socket"):
+            logger.warning("gevent serving mode without monkey patching: backend calls will block the worker")
+
+    with _client_lock:
+        _serving_mode = mode
+        # Rebuilt on next use with the pool settings for this mode
+        _client = None
+        _executor = None
+        _admission = threading.BoundedSemaphore(_admission_limit(mode))
+
+
+def get_executor():
+    """Return the bounded pool used for concurrent backend calls"""
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _client_lock:
+            if _executor is None or _executor_pid != pid:
+                if _serving_mode == "gevent":
+                    from gevent.pool import Pool
+                    _executor = Pool(API_GEVENT_POOL_MAXSIZE)
+                else:
+                    _executor = ThreadPoolExecutor(
+                        max_workers=API_BATCH_WORKERS,
+                        thread_name_prefix="iris-api"
+                    )
+                _executor_pid = pid
+    return _executor
+
+
+def _submit(func, *args, **kwargs):
+    """Start func on the executor and return a callable that waits for its result"""
+    executor = get_executor()
+    # Run in a copy of the caller's context so per-request instrumentation follows the call
+    context = contextvars.copy_context()
+    if _serving_mode == "gevent":
+        return executor.spawn(context.run, func, *args, **kwargs).get
+    return executor.submit(context.run, func, *args, **kwargs).result
+
+
+def _run_calls(calls, token):
+    """Run api_request for each call, concurrently when there is more than one"""
+    if len(calls) == 1:
+        method, endpoint, kwargs = calls[0]
+        return [api_request(method, endpoint, token=token, **kwargs)]
+
+    results = [
+        _submit(api_request, method, endpoint, token=token, **kwargs)
+        for method, endpoint, kwargs in calls
+    ]
+    return [result() for result in results]
+
+
+def api_batch(*calls, token=None):
+    """Make independent API requests concurrently with token refresh on 401
+
+    Each call is a ``(method, endpoint)`` or ``(method, endpoint, kwargs)``
+    tuple, where kwargs are passed through to api_request. Responses are
+    returned in the same order as the calls. The token is refreshed at most
+    once per batch, after which only the unauthorized calls are retried.
+    """
+    calls = [
+        (call[0], call[1], call[2] if len(call) > 2 else {})
+        for call in calls
+    ]
+    if not calls:
+        return []
+
+    responses = _run_calls(calls, token)
+
+    # Worker threads have no request context, so the refresh happens here
+    unauthorized = [i for i, response in enumerate(responses) if response.status_code == 401]
+    for i in unauthorized:
+        responses[i].close()
+    if unauthorized and refresh_token():
+        retried = _run_calls([calls[i] for i in unauthorized], session["token"])
+        for i, response in zip(unauthorized, retried):
+            responses[i] = response
+
+    return responses
+
+
+def _run_pipeline(calls, token, concurrency, rate):
+    """Run api_request for each call, keeping a bounded window of them in flight"""
+    responses = [None] * len(calls)
+    pending = deque()
+    interval = 1.0 / rate if rate else 0.0
+    next_start = time.monotonic()
+
+    for i, (method, endpoint, kwargs) in enumerate(calls):
+        if len(pending) >= concurrency:
+            j, result = pending.popleft()
+            responses[j] = result()
+
+        # Space out the starts so a long list doesn't hit the API all at once
+        if interval:
+            delay = next_start - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_start = max(next_start, time.monotonic()) + interval
+
+        pending.append((i, _submit(api_request, method, endpoint, token=token, **kwargs)))
+
+    for j, result in pending:
+        responses[j] = result()
+    return responses
+
+
+def api_pipeline(calls, token=None, concurrency=API_BATCH_WORKERS, rate=None):
+    """Make many API requests with bounded concurrency and an optional rate limit
+
+    For long lists of calls (e.g. bulk writes) where api_batch would start
+    everything at once: at most `concurrency` calls are in flight and at
+    most `rate` start per second. Calls and results are as for api_batch,
+    including the single token refresh and retry of unauthorized calls.
+    """
+    calls = [
+        (call[0], call[1], call[2] if len(call) > 2 else {})
+        for call in calls
+    ]
+    if not calls:
+        return []
+
+    concurrency = max(1, concurrency)
+    responses = _run_pipeline(calls, token, concurrency, rate)
+
+    unauthorized = [i for i, response in enumerate(responses) if response.status_code == 401]
+    for i in unauthorized:
+        responses[i].close()
+    if unauthorized and refresh_token():
+        retried = _run_pipeline([calls[i] for i in unauthorized], session["token"], concurrency, rate)
+        for i, response in zip(unauthorized, retried):
+            responses[i] = response
+
+    return responses
+
+
+def iter_pipeline(calls, token=None, concurrency=API_BATCH_WORKERS):
+    """Yield responses to a lazy sequence of API calls, in order, as they complete
+
+    Like api_pipeline, but neither the calls nor the responses are ever
+    held as a whole: at most `concurrency` calls are in flight, and the
+    next one starts only as a response is handed out. Must be used within
+    a request context (e.g. under stream_with_context), so a 401 can
+    refresh the token once; calls that used the old token are retried.
+    Calls still in flight when the iteration is abandoned are closed.
+    """
+    calls = iter(calls)
+    concurrency = max(1, concurrency)
+    pending = deque()
+    refreshed = False
+
+    def start():
+        call = next(calls, None)
+        if call is not None:
+            method, endpoint, kwargs = call[0], call[1], call[2] if len(call) > 2 else {}
+            result = _submit(api_request, method, endpoint, token=token, **kwargs)
+            pending.append(((method, endpoint, kwargs), token, result))
+
+    try:
+        for _ in range(concurrency):
+            start()
+
+        while pending:
+            (method, endpoint, kwargs), used, result = pending.popleft()
+            response = result()
+            if response.status_code == 401 and (used != token or not refreshed):
+                # Calls started before a refresh are retried with the new token
+                if used == token:
+                    refreshed = True
+                    if refresh_token():
+                        token = session["token"]
+                if used != token:
+                    response.close()
+                    response = api_request(method, endpoint, token=token, **kwargs)
+            start()
+            yield response
+    finally:
+        for _, _, result in pending:
+            result().close()
+
+
 # Login required decorator
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if "token" not in session:
             flash("Please log in to access this page", "error")
-            return redirect(url_for("login"))
+            return redirect(url_for("main.login"))
+        refresh_if_expiring()
         return f(*args, **kwargs)
     return decorated_function
 
@@ -103,11 +828,18 @@ def role_required(roles):
         def decorated_function(*args, **kwargs):
             if "token" not in session or "user_role" not in session:
                 flash("Please log in to access this page", "error")
-                return redirect(url_for("login"))
+                return redirect(url_for("main.login"))
+            
+            refresh_if_expiring()
+            
+            # Pick up role changes; the identity cache bounds how often this calls the API
+            user = identity.get_identity(session["token"])
+            if user is not None and user["role"] != session["user_role"]:
+                session["user_role"] = user["role"]
             
             if session["user_role"] not in roles:
                 flash("You don't have permission to access this page", "error")
-                return redirect(url_for("dashboard"))
+                return redirect(url_for("standup.dashboard"))
             
             return f(*args, **kwargs)
         return decorated_function
@@ -0,0 +1,49 @@
+from . import cache, helpers
+from .tokens import token_identity, verified_claims
+import os
+
+# Seconds a user's identity (including their role) is reused before /users/me/ is asked again
+IDENTITY_TTL = int(os.getenv("IDENTITY_TTL", "300"))
+IDENTITY_MAX_ENTRIES = int(os.getenv("IDENTITY_MAX_ENTRIES", "4096"))
+# HS256 key the API signs tokens with; when set, identity claims in a verified token are used directly
+JWT_SECRET = os.getenv("JWT_SECRET")
+
+_identities = cache.MemoryBackend(IDENTITY_MAX_ENTRIES)
+
+
+def _from_claims(token):
+    """Build the identity from a verified token that carries the user's details"""
+    claims = verified_claims(token, JWT_SECRET)
+    if not claims or "username" not in claims or "role" not in claims:
+        return None
+
+    user_id = claims.get("user_id", claims.get("id"))
+    if user_id is None:
+        return None
+    return {"id": user_id, "username": claims["username"], "role": claims["role"]}
+
+
+def get_identity(token):
+    """Return {"id", "username", "role"} for the user a token belongs to, or None
+
+    Identities are cached per token subject for IDENTITY_TTL seconds, so a
+    refreshed token or a second login reuses the lookup and role changes
+    made in the API show up within that time.
+    """
+    identity = _from_claims(token)
+    if identity is not None:
+        return identity
+
+    key = token_identity(token)
+    identity = _identities.get(key)
+    if identity is not None:
+        return identity
+
+    response = helpers.api_request("get", "/users/me/", token=token, use_cache=False)
+    if response.status_code != 200:
+        return None
+
+    user = response.json()
+    identity = {"id": user["id"], "username": user["username"], "role": user["role"]}
+    _identities.set(key, identity, IDENTITY_TTL)
+    return identity
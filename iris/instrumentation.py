@@ -0,0 +1,120 @@
+from contextvars import ContextVar
+from flask import before_render_template, g, request, template_rendered
+import json
+import logging
+import os
+import threading
+import time
+
+# Add a Server-Timing header with per-phase durations to every response
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() == "true"
+# Also log one JSON line per request with the timings and backend calls
+TIMING_LOG = os.getenv("TIMING_LOG", "false").lower() == "true"
+
+logger = logging.getLogger("iris.timing")
+
+# Timings of the request being handled; copied into api_batch workers
+_current = ContextVar("iris_request_timings", default=None)
+
+
+class RequestTimings:
+    """Per-phase durations and backend call counts for one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.counts = {}
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase, duration):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + duration
+            self.counts[phase] = self.counts.get(phase, 0) + 1
+
+    def add_call(self, endpoint, duration):
+        with self._lock:
+            self.phases["api"] = self.phases.get("api", 0.0) + duration
+            self.counts["api"] = self.counts.get("api", 0) + 1
+            self.endpoints[endpoint] = self.endpoints.get(endpoint, 0) + 1
+
+    def header(self, total):
+        """Format the timings as a Server-Timing header value"""
+        parts = [f"app;dur={total * 1000:.1f}"]
+        with self._lock:
+            for phase, duration in self.phases.items():
+                count = self.counts[phase]
+                parts.append(f'{phase};dur={duration * 1000:.1f};desc="{count}x"')
+        return ", ".join(parts)
+
+
+def current():
+    """Return the timings of the current request, or None when not collecting"""
+    return _current.get()
+
+
+def record(phase, duration):
+    timings = _current.get()
+    if timings is not None:
+        timings.add(phase, duration)
+
+
+def record_call(endpoint, duration):
+    timings = _current.get()
+    if timings is not None:
+        timings.add_call(endpoint, duration)
+
+
+def init_app(app):
+    """Register the request and template hooks when timing is enabled"""
+    app.config.setdefault("SERVER_TIMING", SERVER_TIMING)
+    app.config.setdefault("TIMING_LOG", TIMING_LOG)
+    if not (app.config["SERVER_TIMING"] or app.config["TIMING_LOG"]):
+        return
+
+    @app.before_request
+    def start_timing():
+        g.timings = RequestTimings()
+        g.timings_token = _current.set(g.timings)
+
+    @app.after_request
+    def emit_timing(response):
+        timings = g.get("timings")
+        if timings is None:
+            return response
+
+        total = time.perf_counter() - timings.start
+        if app.config["SERVER_TIMING"]:
+            response.headers["Server-Timing"] = timings.header(total)
+        if app.config["TIMING_LOG"]:
+            logger.info(json.dumps({
+                "endpoint": request.endpoint,
+                "method": request.method,
+                "status": response.status_code,
+                "total_ms": round(total * 1000, 2),
+                "phases_ms": {k: round(v * 1000, 2) for k, v in timings.phases.items()},
+                "counts": timings.counts,
+                "api_calls": timings.endpoints,
+            }))
+        return response
+
+    @app.teardown_request
+    def stop_timing(exc=None):
+        token = g.pop("timings_token", None)
+        if token is not None:
+            try:
+                _current.reset(token)
+            except ValueError:
+                # Streamed responses finish in a different context
+                _current.set(None)
+
+    def template_started(sender, template, context, **extra):
+        g.render_start = time.perf_counter()
+
+    def template_finished(sender, template, context, **extra):
+        start = g.pop("render_start", None)
+        if start is not None:
+            record("render", time.perf_counter() - start)
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
@@ -0,0 +1,215 @@
+from .helpers import api_request
+from .tokens import token_identity
+from collections import deque
+from flask import Response, current_app, get_template_attribute, stream_with_context
+from iris import logger
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+
+# Push new and changed responses to open session pages over Server-Sent Events
+LIVE_UPDATES = os.getenv("LIVE_UPDATES", "true").lower() == "true"
+# Seconds between polls of a session's responses (one poll per session per worker)
+LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", "5"))
+# Seconds an event stream stays open; 0 answers with what's new and lets the browser
+# reconnect after LIVE_POLL_INTERVAL. Unset: 0 with sync workers, 300 with gevent
+LIVE_STREAM_SECONDS = os.getenv("LIVE_STREAM_SECONDS")
+# Seconds between keep-alive comments on an open stream
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", "15"))
+# Events kept for browsers that reconnect with Last-Event-ID
+LIVE_BACKLOG = int(os.getenv("LIVE_BACKLOG", "200"))
+
+_feeds = {}  # session id -> SessionFeed
+_feeds_lock = threading.Lock()
+
+
+def _fingerprint(row):
+    return hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class SessionFeed:
+    """Poll one session's responses on behalf of everyone watching it
+
+    A background thread polls the API every `interval` seconds while any
+    viewer holds a lease, compares the rows with the previous poll and
+    turns new or changed rows into rendered "response" events (and missing
+    ones into "remove" events). Viewers read the events from the backlog,
+    so N viewers cost one poll per interval. Polls use the token of one of
+    the viewers, each of whom was checked against the API on connecting.
+    """
+
+    def __init__(self, app, session_id, standup_session, timezone, interval=LIVE_POLL_INTERVAL,
+                 backlog=LIVE_BACKLOG):
+        self.app = app
+        self.session_id = session_id
+        self.standup_session = standup_session
+        self.timezone = timezone
+        self.interval = interval
+        # Event ids are "<epoch>-<version>", so ids from an earlier feed for the session don't match
+        self.epoch = secrets.token_hex(4)
+        self.version = 0
+        self.events = deque(maxlen=backlog)  # (version, event, data)
+        self.fingerprints = {}  # response id -> fingerprint
+        self.fragments = {}  # response id -> rendered row
+        self.leases = {}  # viewer -> (token, expires)
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def lease(self, viewer, token, seconds):
+        """Keep polling on the viewer's behalf for another `seconds`"""
+        with self.condition:
+            self.leases[viewer] = (token, time.monotonic() + seconds)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name=f"iris-live-{self.session_id}", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            with _feeds_lock, self.condition:
+                now = time.monotonic()
+                for viewer in [v for v, (_, expires) in self.leases.items() if expires < now]:
+                    del self.leases[viewer]
+                if not self.leases:
+                    # Nobody is watching: stop, and let the next viewer start a new feed
+                    self.thread = None
+                    if _feeds.get(self.session_id) is self:
+                        del _feeds[self.session_id]
+                    return
+                tokens = [token for token, _ in self.leases.values()]
+
+            try:
+                self.poll(tokens)
+            except Exception as e:
+                logger.error(f"Live update poll for session {self.session_id} failed: {str(e)}")
+            time.sleep(self.interval)
+
+    def poll(self, tokens):
+        """Fetch the responses once and publish what changed"""
+        for token in tokens:
+            response = api_request("get", f"/responses/session/{self.session_id}", token=token, use_cache=False)
+            if response.status_code != 401:
+                break
+            # That viewer's token expired; they'll bring a fresh one when they reconnect
+            with self.condition:
+                for viewer in [v for v, (t, _) in self.leases.items() if t == token]:
+                    del self.leases[viewer]
+        else:
+            return
+
+        if response.status_code != 200:
+            return
+
+        rows = response.json()
+        current = {row.get("id"): _fingerprint(row) for row in rows}
+        changed = [row for row in rows if self.fingerprints.get(row.get("id")) != current[row.get("id")]]
+        removed = [response_id for response_id in self.fingerprints if response_id not in current]
+        if not changed and not removed:
+            return
+
+        # Rendered once here, not once per viewer
+        with self.app.app_context():
+            response_row = get_template_attribute("standup/_rows.html", "response_row")
+            rendered = [
+                (row.get("id"), str(response_row(row, self.standup_session, self.timezone)))
+                for row in changed
+            ]
+
+        with self.condition:
+            for response_id, html in rendered:
+                self.fragments[response_id] = html
+                self._publish("response", {"id": response_id, "html": html})
+            for response_id in removed:
+                self.fragments.pop(response_id, None)
+                self._publish("remove", {"id": response_id})
+            self.fingerprints = current
+            self.condition.notify_all()
+
+    def _publish(self, event, data):
+        self.version += 1
+        self.events.append((self.version, event, data))
+
+    def since(self, last_event_id):
+        """Return (version, events) a viewer that saw last_event_id is missing
+
+        Viewers that are new, reconnect to a different feed or fell out of
+        the backlog get every current row instead.
+        """
+        with self.condition:
+            epoch, _, version = (last_event_id or "").partition("-")
+            try:
+                version = int(version) if epoch == self.epoch else None
+            except ValueError:
+                version = None
+
+            oldest = self.events[0][0] if self.events else self.version + 1
+            if version is None or version > self.version or version < oldest - 1:
+                rows = [(self.version, "response", {"id": i, "html": html}) for i, html in self.fragments.items()]
+                return self.version, rows
+            return self.version, [event for event in self.events if event[0] > version]
+
+    def wait(self, version, timeout):
+        """Wait up to timeout for events after version; return (version, events)"""
+        with self.condition:
+            if self.version == version:
+                self.condition.wait(timeout)
+            return self.version, [event for event in self.events if event[0] > version]
+
+
+def subscribe(session_id, standup_session, token, lease_seconds):
+    """Return the session's feed, started if needed, with a lease for this viewer"""
+    timezone = standup_session.get("standup", {}).get("timezone", "UTC")
+    with _feeds_lock:
+        feed = _feeds.get(session_id)
+        if feed is None:
+            feed = _feeds[session_id] = SessionFeed(
+                current_app._get_current_object(), session_id, standup_session, timezone
+            )
+        feed.lease(token_identity(token), token, lease_seconds)
+    return feed
+
+
+def _stream_seconds():
+    if LIVE_STREAM_SECONDS is not None:
+        return float(LIVE_STREAM_SECONDS)
+    return 300.0 if current_app.config.get("SERVING_MODE") == "gevent" else 0.0
+
+
+def _format(feed, version, event, data):
+    return f"id: {feed.epoch}-{version}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def event_stream(session_id, standup_session, token, last_event_id=None):
+    """Server-Sent Events response with the session's new and changed responses"""
+    seconds = _stream_seconds()
+    # Leases outlive the gap between reconnects, or between heartbeats on an open stream
+    lease_seconds = 3 * max(LIVE_POLL_INTERVAL, LIVE_HEARTBEAT if seconds else 0)
+    feed = subscribe(session_id, standup_session, token, lease_seconds)
+    viewer = token_identity(token)
+
+    def generate():
+        yield f"retry: {int(feed.interval * 1000)}\n\n"
+        version, events = feed.since(last_event_id)
+        if not events and version:
+            # Nothing new: send the position anyway so a reconnect resumes from it
+            yield f"id: {feed.epoch}-{version}\n\n"
+
+        deadline = time.monotonic() + seconds
+        while True:
+            for event_version, event, data in events:
+                yield _format(feed, event_version, event, data)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            version, events = feed.wait(version, min(remaining, LIVE_HEARTBEAT))
+            feed.lease(viewer, token, lease_seconds)
+            if not events:
+                yield ": keep-alive\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
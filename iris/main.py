@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from .helpers import API_URL, api_request_with_refresh
-import requests
+from .helpers import api_request, api_request_with_refresh
+from .identity import get_identity
 
 bp = Blueprint('main', __name__, url_prefix='/')
 
@@ -19,9 +19,10 @@ def login():
         password = request.form.get("password")
         
         # Authenticate with the API
-        response = requests.post(
-            f"{API_URL}/token",
-            data={"username": username, "password": password}
+        response = api_request(
+            "post",
+            "/token",
+            form={"username": username, "password": password}
         )
         
         if response.status_code == 200:
@@ -30,10 +31,9 @@ def login():
             if "refresh_token" in token_data:
                 session["refresh_token"] = token_data["refresh_token"]
             
-            # Get user info
-            user_response = api_request_with_refresh("get", "/users/me/", token=session["token"])
-            if user_response.status_code == 200:
-                user_data = user_response.json()
+            # Get user info, from the token or the identity cache when possible
+            user_data = get_identity(session["token"])
+            if user_data is not None:
                 session["user_id"] = user_data["id"]
                 session["username"] = user_data["username"]
                 session["user_role"] = user_data["role"]
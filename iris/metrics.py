@@ -0,0 +1,234 @@
+from flask import Response, abort, before_render_template, current_app, g, request, template_rendered
+from functools import lru_cache
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+import hmac
+import os
+import re
+import time
+
+# Serve /metrics and record request, backend and render metrics
+METRICS = os.getenv("METRICS", "true").lower() == "true"
+# Bearer token a scraper must send to read /metrics; unset, /metrics isn't served
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# Set (by gunicorn.conf.py) to share metrics between worker processes
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+_enabled = False
+
+REQUEST_SECONDS = Histogram(
+    "iris_request_duration_seconds",
+    "Time to produce a response (headers, for streamed pages), by route",
+    ["route", "method"],
+)
+RESPONSES = Counter(
+    "iris_responses_total",
+    "Responses sent, by route and status code",
+    ["route", "method", "status"],
+)
+BACKEND_SECONDS = Histogram(
+    "iris_backend_request_duration_seconds",
+    "Backend API call latency, by endpoint",
+    ["method", "endpoint"],
+)
+BACKEND_RESPONSES = Counter(
+    "iris_backend_responses_total",
+    "Backend API responses, by endpoint and status code",
+    ["method", "endpoint", "status"],
+)
+BACKEND_FAILURES = Counter(
+    "iris_backend_failures_total",
+    "Backend calls that failed or were refused (circuit_open, overloaded)",
+    ["method", "endpoint", "reason"],
+)
+BREAKER_TRANSITIONS = Counter(
+    "iris_backend_breaker_transitions_total",
+    "Circuit breaker state changes, by endpoint and new state",
+    ["endpoint", "state"],
+)
+CACHE_LOOKUPS = Counter(
+    "iris_api_cache_total",
+    "GET response cache lookups: hit, revalidated (304), miss or stale (served while the API failed)",
+    ["result"],
+)
+REFRESH_ATTEMPTS = Counter(
+    "iris_token_refresh_attempts_total",
+    "Access token refresh calls made to the API",
+)
+REFRESH_SUCCESSES = Counter(
+    "iris_token_refresh_successes_total",
+    "Access token refreshes that returned a new token",
+)
+REFRESH_SHARED = Counter(
+    "iris_token_refresh_shared_total",
+    "Token refreshes served by waiting for one already in flight",
+)
+SUBMISSIONS = Counter(
+    "iris_response_submissions_total",
+    "Standup response submissions: delivered, retried, duplicate (refused locally) or failed",
+    ["result"],
+)
+# Gauges copied from each worker's own counters after every request; across
+# gunicorn workers they are summed over the live ones
+POOL_REQUESTS = Gauge(
+    "iris_backend_pool_requests",
+    "Backend requests by connection pool result: hit (reused a kept-alive connection) or miss (opened one)",
+    ["result"],
+    multiprocess_mode="livesum",
+)
+CACHE_EVENTS = Gauge(
+    "iris_api_cache_events",
+    "GET response cache counters by endpoint group: hits, misses, stores and revalidated (304)",
+    ["group", "event"],
+    multiprocess_mode="livesum",
+)
+CACHE_BYTES_SAVED = Gauge(
+    "iris_api_cache_bytes_saved",
+    "Response bytes not downloaded thanks to 304 revalidations, by endpoint group",
+    ["group"],
+    multiprocess_mode="livesum",
+)
+CACHE_EVICTIONS = Gauge(
+    "iris_api_cache_evictions",
+    "Least recently used entries evicted from the GET response cache",
+    multiprocess_mode="livesum",
+)
+BREAKER_STATE = Gauge(
+    "iris_backend_breaker_state",
+    "Workers whose circuit breaker for an endpoint is in each state (closed, open, half_open)",
+    ["endpoint", "state"],
+    multiprocess_mode="livesum",
+)
+RENDER_SECONDS = Histogram(
+    "iris_template_render_seconds",
+    "Template render time, by template",
+    ["template"],
+)
+
+
+@lru_cache(maxsize=1024)
+def endpoint_label(endpoint):
+    """Collapse ids in a backend path so each endpoint is a single series"""
+    return re.sub(r"/\d+(?=/|$)", "/{id}", endpoint)
+
+
+def observe_backend(method, endpoint, status, duration):
+    if _enabled:
+        label = endpoint_label(endpoint)
+        BACKEND_SECONDS.labels(method, label).observe(duration)
+        BACKEND_RESPONSES.labels(method, label, str(status)).inc()
+
+
+def backend_failure(method, endpoint, reason):
+    if _enabled:
+        BACKEND_FAILURES.labels(method, endpoint_label(endpoint), reason).inc()
+
+
+def breaker_transition(endpoint, state):
+    if _enabled:
+        BREAKER_TRANSITIONS.labels(endpoint, state).inc()
+
+
+def cache_lookup(result):
+    if _enabled:
+        CACHE_LOOKUPS.labels(result).inc()
+
+
+def token_refresh(success):
+    if _enabled:
+        REFRESH_ATTEMPTS.inc()
+        if success:
+            REFRESH_SUCCESSES.inc()
+
+
+def token_refresh_shared():
+    if _enabled:
+        REFRESH_SHARED.inc()
+
+
+def submission(result):
+    if _enabled:
+        SUBMISSIONS.labels(result).inc()
+
+
+def refresh_gauges():
+    """Copy this worker's connection pool, response cache and breaker state into their gauges"""
+    from . import cache, helpers
+
+    stats = helpers.pool_stats()
+    POOL_REQUESTS.labels("hit").set(stats["hits"])
+    POOL_REQUESTS.labels("miss").set(stats["misses"])
+
+    stats = cache.cache_stats()
+    for group, counters in stats.get("endpoints", {}).items():
+        for event in ("hits", "misses", "stores", "revalidated"):
+            CACHE_EVENTS.labels(group, event).set(counters[event])
+        CACHE_BYTES_SAVED.labels(group).set(counters["bytes_saved"])
+    if stats:
+        CACHE_EVICTIONS.set(stats["total"]["evictions"])
+
+    for endpoint, current in helpers.breaker_states().items():
+        for state in (helpers.CircuitBreaker.CLOSED, helpers.CircuitBreaker.OPEN, helpers.CircuitBreaker.HALF_OPEN):
+            BREAKER_STATE.labels(endpoint, state).set(int(state == current))
+
+
+def metrics_view():
+    """Expose the metrics in the Prometheus text format to holders of METRICS_TOKEN"""
+    token = current_app.config["METRICS_TOKEN"]
+    presented = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not token or not hmac.compare_digest(presented.encode("utf-8"), token.encode("utf-8")):
+        abort(404)
+
+    refresh_gauges()
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """Register /metrics and the request and template hooks when enabled"""
+    global _enabled
+
+    app.config.setdefault("METRICS", METRICS)
+    app.config.setdefault("METRICS_TOKEN", METRICS_TOKEN)
+    if not app.config["METRICS"]:
+        return
+    _enabled = True
+
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            route = request.endpoint or "unmatched"
+            REQUEST_SECONDS.labels(route, request.method).observe(time.perf_counter() - start)
+            RESPONSES.labels(route, request.method, str(response.status_code)).inc()
+        refresh_gauges()
+        return response
+
+    def template_started(sender, template, context, **extra):
+        g.metrics_render_start = time.perf_counter()
+
+    def template_finished(sender, template, context, **extra):
+        start = g.pop("metrics_render_start", None)
+        if start is not None:
+            RENDER_SECONDS.labels(template.name or "unknown").observe(time.perf_counter() - start)
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
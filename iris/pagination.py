@@ -0,0 +1,64 @@
+from itertools import chain, islice
+import os
+
+# Rows per page for the session and response lists
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+
+def page_args(args):
+    """Read (offset, last_id, limit) from the cursor and limit query params
+
+    A cursor is "<offset>:<id of the last row shown>"; a missing or
+    malformed one means the first page.
+    """
+    try:
+        limit = int(args.get("limit", PAGE_SIZE))
+    except ValueError:
+        limit = PAGE_SIZE
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    offset, _, last_id = args.get("cursor", "").partition(":")
+    try:
+        offset = max(0, int(offset))
+    except ValueError:
+        return 0, None, limit
+
+    return offset, last_id or None, limit
+
+
+def page_params(offset, limit):
+    """API query params for one page, plus a row to tell if there is another"""
+    return {"skip": offset, "limit": limit + 1}
+
+
+def paginate(items, offset, last_id, limit):
+    """Return (rows, next_cursor) for one page of an API listing
+
+    items may be a list or a lazy iterator. If the API ignored the paging
+    params and sent the whole listing, the page is sliced out locally;
+    that's detected by getting more rows than asked for, or by the row
+    before this page being the one the cursor ended on.
+    """
+    iterator = iter(items)
+    head = list(islice(iterator, limit + 2))
+
+    whole_listing = len(head) > limit + 1
+    if not whole_listing and offset and last_id is not None and offset <= len(head):
+        whole_listing = str(head[offset - 1].get("id")) == last_id
+
+    rows = chain(head, iterator)
+    if whole_listing:
+        rows = islice(rows, offset, None)
+    rows = list(islice(rows, limit + 1))
+
+    # Stop downloading the rest of a streamed listing
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, f"{offset + limit}:{rows[-1].get('id')}"
@@ -0,0 +1,258 @@
+from . import cache
+from collections import deque
+from datetime import date, datetime, timedelta
+from .timezones import UTC, get_timezone, is_timezone, parse_datetime
+from .tokens import token_identity
+import heapq
+import os
+import threading
+
+# Most sessions one bulk schedule may create
+BULK_MAX_SESSIONS = int(os.getenv("BULK_MAX_SESSIONS", "200"))
+# Session creates in flight at once, and started per second, during a bulk schedule
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "4"))
+BULK_RATE = float(os.getenv("BULK_RATE", "10"))
+
+# Days ahead shown in the dashboard agenda, and the most meetings it lists
+AGENDA_DAYS = int(os.getenv("AGENDA_DAYS", "7"))
+AGENDA_LIMIT = int(os.getenv("AGENDA_LIMIT", "50"))
+# Users whose occurrence index each worker keeps
+AGENDA_MAX_USERS = int(os.getenv("AGENDA_MAX_USERS", "1024"))
+# Timezone the agenda is shown in until the browser reports the viewer's
+AGENDA_TIMEZONE = os.getenv("AGENDA_TIMEZONE", "UTC")
+
+API_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def parse_days(days_of_week):
+    """Turn a standup's "0,2,4" days_of_week (Monday is 0) into a set of weekdays"""
+    days = set()
+    for day in (days_of_week or "").split(","):
+        day = day.strip()
+        if day.isdigit() and int(day) < 7:
+            days.add(int(day))
+    return days
+
+
+def parse_time_of_day(value):
+    """Parse a standup's "HH:MM[:SS]" time of day"""
+    for format in ("%H:%M:%S", "%H:%M"):
+        try:
+            return datetime.strptime(value, format).time()
+        except (TypeError, ValueError):
+            continue
+    raise ValueError(f"Invalid time of day: {value!r}")
+
+
+def recurrence_rule(standup):
+    """Return a standup's (weekdays, time of day, timezone name) meeting rule"""
+    return (
+        frozenset(parse_days(standup.get("days_of_week"))),
+        parse_time_of_day(standup.get("time_of_day")),
+        standup.get("timezone") or "UTC",
+    )
+
+
+def iter_meetings(rule, start, end=None):
+    """Yield the naive UTC datetimes of a rule's meetings on the dates from start to end
+
+    Each meeting is at the rule's time of day in its own timezone, so the UTC
+    time follows daylight saving changes. Times that fall in a DST gap are
+    moved forward by the gap.
+    """
+    days, time_of_day, timezone = rule
+    if not days:
+        return
+    tz = get_timezone(timezone)
+
+    day = start
+    while end is None or day <= end:
+        if day.weekday() in days:
+            local = tz.normalize(tz.localize(datetime.combine(day, time_of_day)))
+            yield local.astimezone(UTC).replace(tzinfo=None)
+        day += timedelta(days=1)
+
+
+def expand_schedule(standup, start, end):
+    """Return the UTC datetimes of a standup's meetings from start to end (inclusive dates)"""
+    if isinstance(start, str):
+        start = date.fromisoformat(start)
+    if isinstance(end, str):
+        end = date.fromisoformat(end)
+    if end < start:
+        raise ValueError("The end date is before the start date")
+    rule = recurrence_rule(standup)
+    if not is_timezone(rule[2]):
+        raise ValueError(f"Unknown timezone: {rule[2]}")
+
+    meetings = []
+    for meeting in iter_meetings(rule, start, end):
+        meetings.append(meeting)
+        if len(meetings) > BULK_MAX_SESSIONS:
+            raise ValueError(f"More than {BULK_MAX_SESSIONS} sessions in that range")
+
+    return meetings
+
+
+def session_minute(value):
+    """Key a session date from the API by its UTC minute, to spot duplicates"""
+    try:
+        parsed = parse_datetime(value)
+    except (AttributeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(UTC).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%dT%H:%M")
+
+
+class _Track:
+    """One standup's rule and its precomputed upcoming meetings"""
+
+    def __init__(self, standup, rule, version, start):
+        self.standup = standup
+        self.rule = rule
+        self.version = version
+        self.meetings = deque()
+        self.next_day = start  # first date not expanded yet
+
+
+class OccurrenceIndex:
+    """Upcoming meetings of a set of standups, ordered by a heap of next occurrences
+
+    Each standup keeps its meetings up to the horizon precomputed, and the
+    heap holds one (next meeting, standup id) entry per standup. update()
+    only re-expands standups whose rule changed and agenda() drops past
+    meetings and extends the lists as time moves on, so memory stays at a
+    few datetimes per standup and a render is one k-way merge.
+    """
+
+    def __init__(self, horizon_days=AGENDA_DAYS):
+        self.horizon = timedelta(days=horizon_days)
+        self._tracks = {}  # standup id -> _Track
+        self._heap = []  # (next meeting, standup id, version); entries of changed standups go stale
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _push(self, standup_id, track):
+        if track.meetings:
+            heapq.heappush(self._heap, (track.meetings[0], standup_id, track.version))
+
+    def _extend(self, standup_id, track, until):
+        """Expand a track's meetings through until; local dates can be a day off UTC ones"""
+        last_day = until.date() + timedelta(days=1)
+        if track.next_day > last_day:
+            return
+
+        was_empty = not track.meetings
+        track.meetings.extend(iter_meetings(track.rule, track.next_day, last_day))
+        track.next_day = last_day + timedelta(days=1)
+        if was_empty:
+            self._push(standup_id, track)
+
+    def update(self, standups, now):
+        """Track exactly these standups, re-expanding only those whose rule changed
+
+        Standups with an invalid time of day or an unknown timezone are left out.
+        """
+        with self._lock:
+            seen = set()
+            for standup in standups:
+                standup_id = standup.get("id")
+                try:
+                    rule = recurrence_rule(standup)
+                except ValueError:
+                    continue
+                if standup_id is None or not is_timezone(rule[2]):
+                    continue
+                seen.add(standup_id)
+
+                track = self._tracks.get(standup_id)
+                if track is not None and track.rule == rule:
+                    track.standup = standup
+                    continue
+
+                self._version += 1
+                track = _Track(standup, rule, self._version, (now - timedelta(days=1)).date())
+                self._tracks[standup_id] = track
+                self._extend(standup_id, track, now + self.horizon)
+
+            for standup_id in [i for i in self._tracks if i not in seen]:
+                del self._tracks[standup_id]
+
+            # Drop stale heap entries once they outnumber the live ones
+            if len(self._heap) > 2 * len(self._tracks) + 16:
+                self._heap = []
+                for standup_id, track in self._tracks.items():
+                    self._push(standup_id, track)
+
+    def _is_current(self, standup_id, version):
+        track = self._tracks.get(standup_id)
+        return track is not None and track.version == version
+
+    def agenda(self, now, limit=AGENDA_LIMIT):
+        """Return [(UTC datetime, standup)] for meetings from now to the horizon, in order"""
+        with self._lock:
+            end = now + self.horizon
+
+            # Move every standup whose next meeting has passed on to its following one
+            while self._heap and (self._heap[0][0] < now or not self._is_current(*self._heap[0][1:])):
+                _, standup_id, version = heapq.heappop(self._heap)
+                if not self._is_current(standup_id, version):
+                    continue
+                track = self._tracks[standup_id]
+                while track.meetings and track.meetings[0] < now:
+                    track.meetings.popleft()
+                if track.meetings:
+                    self._push(standup_id, track)
+                self._extend(standup_id, track, end)
+
+            for standup_id, track in self._tracks.items():
+                self._extend(standup_id, track, end)
+
+            # Merge the per-standup lists, starting from the heap of next meetings
+            merge = [
+                (meeting, standup_id, 0)
+                for meeting, standup_id, version in self._heap
+                if self._is_current(standup_id, version)
+            ]
+            heapq.heapify(merge)
+
+            agenda = []
+            while merge and len(agenda) < limit:
+                meeting, standup_id, position = heapq.heappop(merge)
+                if meeting > end:
+                    break
+                track = self._tracks[standup_id]
+                agenda.append((meeting, track.standup))
+                if position + 1 < len(track.meetings):
+                    heapq.heappush(merge, (track.meetings[position + 1], standup_id, position + 1))
+
+            return agenda
+
+
+_indexes = cache.MemoryBackend(AGENDA_MAX_USERS)
+
+
+def upcoming(token, standups, timezone=AGENDA_TIMEZONE, now=None):
+    """Return the user's meetings for the next AGENDA_DAYS days in their timezone
+
+    Each item is {"start": aware datetime in timezone, "day": its date,
+    "standup": standup}. Unknown timezones fall back to AGENDA_TIMEZONE.
+    The occurrence index is kept per user between requests.
+    """
+    if not is_timezone(timezone):
+        timezone = AGENDA_TIMEZONE
+    now = now or datetime.now(UTC).replace(tzinfo=None, second=0, microsecond=0)
+    key = token_identity(token)
+    index = _indexes.get(key)
+    if index is None:
+        index = OccurrenceIndex()
+        _indexes.set(key, index, 86400)
+
+    index.update(standups, now)
+    tz = get_timezone(timezone)
+    agenda = []
+    for meeting, standup in index.agenda(now):
+        start = meeting.replace(tzinfo=UTC).astimezone(tz)
+        agenda.append({"start": start, "day": start.date(), "standup": standup})
+    return agenda
@@ -0,0 +1,226 @@
+from collections import OrderedDict
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from werkzeug.datastructures import CallbackDict
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+
+# Where session data lives: "cookie" (signed cookie), "memory" (per worker) or "sqlite" (shared by all workers)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "cookie").lower()
+# Seconds a server-side session survives without being used
+SESSION_LIFETIME = int(os.getenv("SESSION_LIFETIME", "86400"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_PATH = os.getenv("SESSION_PATH", "/tmp/iris-sessions.sqlite3")
+# Seconds between sweeps of expired sessions
+SESSION_SWEEP_INTERVAL = int(os.getenv("SESSION_SWEEP_INTERVAL", "300"))
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{43}$")
+
+
+class MemorySessionBackend:
+    """In-process LRU of sessions, private to one worker"""
+
+    def __init__(self, max_entries=SESSION_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        """Return (data, expires) for a live session, or None"""
+        with self._lock:
+            item = self._entries.get(sid)
+            if item is None:
+                return None
+            if item[1] < time.time():
+                del self._entries[sid]
+                return None
+            self._entries.move_to_end(sid)
+            return item
+
+    def set(self, sid, data, ttl):
+        with self._lock:
+            self._entries[sid] = (data, time.time() + ttl)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def sweep(self):
+        """Drop expired sessions and return how many there were"""
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (_, expires) in self._entries.items() if expires < now]
+            for sid in expired:
+                del self._entries[sid]
+        return len(expired)
+
+
+class SQLiteSessionBackend:
+    """Sessions in a SQLite file shared by every worker on the host"""
+
+    def __init__(self, path=SESSION_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        # Connections can't cross threads or a fork, so keep one per thread per process
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT, expires REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, sid):
+        return self._connect().execute(
+            "SELECT data, expires FROM sessions WHERE sid = ? AND expires >= ?", (sid, time.time())
+        ).fetchone()
+
+    def set(self, sid, data, ttl):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)",
+            (sid, data, time.time() + ttl)
+        )
+
+    def delete(self, sid):
+        self._connect().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def sweep(self):
+        return self._connect().execute(
+            "DELETE FROM sessions WHERE expires < ?", (time.time(),)
+        ).rowcount
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session data loaded from a backend, addressed by an opaque id"""
+
+    def __init__(self, initial=None, sid=None, expires=None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires = expires
+        self.authenticated = "token" in self
+        self.modified = False
+        self.accessed = False
+
+    # Reads count as access too, as in Flask's cookie session, so responses
+    # built from the session are marked private
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+
+class ServerSessionInterface(SessionInterface):
+    """Keep session data server-side; the cookie holds only a random id
+
+    Saves only happen when the session changed, or when it has used up half
+    its lifetime (so active sessions slide forward without a write per
+    request). A new id is issued when a session gains or loses its token, so
+    an id handed out before login (or used before logout) can't be reused.
+    """
+
+    serializer = session_json_serializer
+
+    def __init__(self, backend, lifetime=SESSION_LIFETIME, sweep_interval=SESSION_SWEEP_INTERVAL):
+        self.backend = backend
+        self.lifetime = lifetime
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+        self._sweep_lock = threading.Lock()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and _SESSION_ID.match(sid):
+            item = self.backend.get(sid)
+            if item is not None:
+                data, expires = item
+                return ServerSession(self.serializer.loads(data), sid, expires)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        self._maybe_sweep()
+
+        if session.accessed or session.sid:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.sid:
+                self.backend.delete(session.sid)
+            if session.modified or session.sid:
+                response.delete_cookie(
+                    name,
+                    domain=domain,
+                    path=path,
+                    secure=self.get_cookie_secure(app),
+                    samesite=self.get_cookie_samesite(app),
+                    httponly=self.get_cookie_httponly(app),
+                )
+            return
+
+        renew = session.sid is not None and session.expires - time.time() < self.lifetime / 2
+        if not (session.modified or renew or session.sid is None):
+            return
+
+        if session.sid is None or (session.modified and ("token" in session) != session.authenticated):
+            if session.sid:
+                self.backend.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+        self.backend.set(session.sid, self.serializer.dumps(dict(session)), self.lifetime)
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+            partitioned=self.get_cookie_partitioned(app),
+        )
+
+    def _maybe_sweep(self):
+        if time.monotonic() < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = time.monotonic() + self.sweep_interval
+            self.backend.sweep()
+        finally:
+            self._sweep_lock.release()
+
+
+def create_session_interface(backend=SESSION_BACKEND):
+    """Return the session interface for a backend name, or None for Flask's cookie sessions"""
+    if backend == "cookie":
+        return None
+    if backend == "memory":
+        return ServerSessionInterface(MemorySessionBackend())
+    if backend == "sqlite":
+        return ServerSessionInterface(SQLiteSessionBackend())
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -1,7 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from .helpers import api_request_with_refresh, login_required, role_required
+from flask import Blueprint, jsonify, make_response, render_template, request, redirect, url_for, flash, session
+from . import live, submissions
+from .export import FORMATS as EXPORT_FORMATS, export_response
+from .helpers import api_batch, api_pipeline, api_request_with_refresh, iter_json_array, login_required, role_required
+from .pagination import page_args, page_params, paginate
+from .scheduling import API_DATETIME_FORMAT, BULK_CONCURRENCY, BULK_RATE, expand_schedule, session_minute, upcoming
+from .streaming import stream_page, streaming_enabled
+from .summary import dashboard_summary
+from .timezones import is_timezone
 from iris import logger
-import pytz
 
 bp = Blueprint('standup', __name__, url_prefix='/standup')
 
@@ -15,7 +21,22 @@ def dashboard():
         
         if response.status_code == 200:
             standups = response.json()
-            return render_template("standup/dashboard.html", standups=standups)
+            
+            # Merged upcoming meetings, in the timezone the browser reported
+            try:
+                agenda = upcoming(session["token"], standups, request.cookies.get("tz"))
+            except Exception as e:
+                logger.error(f"Failed to build the dashboard agenda: {str(e)}")
+                agenda = []
+            
+            # Latest session, who hasn't responded and open blockers, per standup
+            try:
+                summaries = dashboard_summary(session["token"], standups)
+            except Exception as e:
+                # The standups are still worth showing without their summaries
+                logger.error(f"Failed to build dashboard summaries: {str(e)}")
+                summaries = {}
+            return render_template("standup/dashboard.html", standups=standups, agenda=agenda, summaries=summaries)
         
         elif response.status_code == 401:
             # Token expired or invalid, redirect to login
@@ -80,37 +101,118 @@ def create():
     users_response = api_request_with_refresh("get", "/users/", token=session["token"])
     users = users_response.json() if users_response.status_code == 200 else []
     
-    # Get all timezones
-    timezones = pytz.all_timezones
-    
-    return render_template("standup/new_standup.html", users=users, timezones=timezones)
+    return render_template("standup/new_standup.html", users=users)
+
+
+def _load_page(response, offset, last_id, limit):
+    """Return (rows, next_cursor) for a listing response, or no rows if it failed
+
+    The page is read in full before it's rendered: telling whether the API
+    ignored the paging params takes the rows past the page. A streamed page
+    still sends its head first, and holds at most one page of rows.
+    """
+    if response.status_code != 200:
+        response.close()
+        return [], None
+    return paginate(iter_json_array(response), offset, last_id, limit)
+
+
+def _rows_fragment(template, next_url, **context):
+    """Render a page of rows for "load more", naming the page after it in a header"""
+    response = make_response(render_template(template, **context))
+    if next_url:
+        response.headers["X-Next-Page"] = next_url
+    return response
 
 
 @bp.route("/<int:standup_id>")
 @login_required
 def view(standup_id):
-    # Get standup details
-    standup_response = api_request_with_refresh("get", f"/standups/{standup_id}", token=session["token"])
+    offset, last_id, limit = page_args(request.args)
+    stream = streaming_enabled()
+    
+    # Get standup details and a page of its sessions concurrently
+    standup_response, sessions_response = api_batch(
+        ("get", f"/standups/{standup_id}"),
+        ("get", f"/sessions/standup/{standup_id}", {"params": page_params(offset, limit), "stream": stream}),
+        token=session["token"]
+    )
     
     if standup_response.status_code != 200:
+        sessions_response.close()
         flash("Standup not found", "error")
         return redirect(url_for("standup.dashboard"))
     
     standup = standup_response.json()
+    sessions, next_cursor = _load_page(sessions_response, offset, last_id, limit)
+    
+    render = stream_page if stream else render_template
+    return render(
+        "standup/view_standup.html",
+        standup=standup,
+        sessions=sessions,
+        next_cursor=next_cursor,
+        limit=limit
+    )
+
+
+@bp.route("/<int:standup_id>/sessions")
+@login_required
+def sessions_page(standup_id):
+    offset, last_id, limit = page_args(request.args)
+    
+    standup_response, sessions_response = api_batch(
+        ("get", f"/standups/{standup_id}"),
+        ("get", f"/sessions/standup/{standup_id}", {"params": page_params(offset, limit), "stream": True}),
+        token=session["token"]
+    )
+    
+    if standup_response.status_code != 200:
+        sessions_response.close()
+        return "", 404
+    
+    sessions, next_cursor = _load_page(sessions_response, offset, last_id, limit)
+    next_url = next_cursor and url_for("standup.sessions_page", standup_id=standup_id, cursor=next_cursor, limit=limit)
+    
+    return _rows_fragment(
+        "standup/session_rows.html",
+        next_url,
+        standup=standup_response.json(),
+        sessions=sessions
+    )
+
+
+@bp.route("/<int:standup_id>/export")
+@login_required
+def export(standup_id):
+    format = request.args.get("format", "csv")
+    timezone = request.args.get("timezone")
+    if format not in EXPORT_FORMATS or (timezone and not is_timezone(timezone)):
+        return "", 400
     
-    # Get sessions for this standup
-    sessions_response = api_request_with_refresh("get", f"/sessions/standup/{standup_id}", token=session["token"])
-    sessions = sessions_response.json() if sessions_response.status_code == 200 else []
+    standup_response = api_request_with_refresh("get", f"/standups/{standup_id}", token=session["token"])
+    if standup_response.status_code != 200:
+        return "", 404
     
-    return render_template("standup/view_standup.html", standup=standup, sessions=sessions)
+    return export_response(standup_response.json(), session["token"], format, timezone)
 
 
 @bp.route("/<int:standup_id>/edit", methods=["GET", "POST"])
 @login_required
 @role_required(["admin"])
 def edit(standup_id):
-    # Get standup details
-    standup_response = api_request_with_refresh("get", f"/standups/{standup_id}", token=session["token"])
+    users_response = None
+    
+    if request.method == "POST":
+        # Get standup details
+        standup_response = api_request_with_refresh("get", f"/standups/{standup_id}", token=session["token"])
+    else:
+        # Get standup details and all users for the form concurrently
+        standup_response, users_response = api_batch(
+            ("get", f"/standups/{standup_id}"),
+            ("get", "/users/"),
+            token=session["token"]
+        )
     
     if standup_response.status_code != 200:
         flash("Standup not found", "error")
@@ -149,18 +251,16 @@ def edit(standup_id):
         
         if response.status_code == 200:
             flash("Standup updated successfully", "success")
-            return redirect(url_for("standup.view_standup", standup_id=standup_id))
+            return redirect(url_for("standup.view", standup_id=standup_id))
         else:
             error_data = response.json()
             flash(f"Failed to update standup: {error_data.get('detail', 'Unknown error')}", "error")
     
     # Get all users for the form
-    users_response = api_request_with_refresh("get", "/users/", token=session["token"])
+    if users_response is None:
+        users_response = api_request_with_refresh("get", "/users/", token=session["token"])
     users = users_response.json() if users_response.status_code == 200 else []
     
-    # Get all timezones
-    timezones = pytz.all_timezones
-    
     # Get current standup members
     member_ids = [member["id"] for member in standup.get("members", [])]
     
@@ -168,19 +268,52 @@ def edit(standup_id):
         "standup/edit_standup.html", 
         standup=standup, 
         users=users, 
-        timezones=timezones, 
         member_ids=member_ids
     )
 
 
+def _has_responded(session_id, responses, next_cursor):
+    """Check whether the current user already responded to a session"""
+    user_id = session.get("user_id")
+    if any(r.get("user_id") == user_id for r in responses):
+        return True
+    
+    if next_cursor is None:
+        return False
+    
+    # Only one page was loaded: check the session's responded users, fetched at most once per RESPONDED_TTL
+    return user_id in submissions.responded_users(session_id, session["token"])
+
+
 @bp.route("/sessions/<int:session_id>", methods=["GET", "POST"])
 @login_required
 def view_session(session_id):
+    if request.method == "POST":
+        # Queued for a background worker; the page shows it as pending until it lands
+        submissions.submit(
+            session_id,
+            {
+                "yesterday": request.form.get("yesterday"),
+                "today": request.form.get("today"),
+                "blockers": request.form.get("blockers")
+            },
+            session["token"]
+        )
+        return redirect(url_for("standup.view_session", session_id=session_id))
+    
     try:
-        # Get session details
-        session_response = api_request_with_refresh("get", f"/sessions/{session_id}", token=session["token"])
+        offset, last_id, limit = page_args(request.args)
+        stream = streaming_enabled()
+        
+        # Get session details and a page of its responses concurrently
+        session_response, responses_response = api_batch(
+            ("get", f"/sessions/{session_id}"),
+            ("get", f"/responses/session/{session_id}", {"params": page_params(offset, limit), "stream": stream}),
+            token=session["token"]
+        )
         
         if session_response.status_code != 200:
+            responses_response.close()
             flash("Failed to load session", "error")
             return redirect(url_for("standup.dashboard"))
         
@@ -189,50 +322,98 @@ def view_session(session_id):
         # Get the standup timezone
         standup_timezone = standup_session.get('standup', {}).get('timezone', 'UTC')
         
-        # Get responses for this session
-        responses_response = api_request_with_refresh("get", f"/responses/session/{session_id}", token=session["token"])
-        responses = responses_response.json() if responses_response.status_code == 200 else []
+        responses, next_cursor = _load_page(responses_response, offset, last_id, limit)
+        if not offset and next_cursor is None:
+            submissions.remember_responses(session_id, (r.get("user_id") for r in responses))
         
         # Check if the current user has already submitted a response
-        user_has_responded = any(r["user_id"] == session.get("user_id") for r in responses)
+        user_has_responded = _has_responded(session_id, responses, next_cursor)
         
-        if request.method == "POST" and not user_has_responded:
-            # Submit a new response
-            yesterday = request.form.get("yesterday")
-            today = request.form.get("today")
-            blockers = request.form.get("blockers")
-            
-            response = api_request_with_refresh(
-                "post",
-                "/responses/",
-                data={
-                    "session_id": session_id,
-                    "yesterday": yesterday,
-                    "today": today,
-                    "blockers": blockers
-                },
-                token=session["token"]
-            )
-            
-            if response.status_code == 200:
-                flash("Response submitted successfully", "success")
-                return redirect(url_for("standup.view_session", session_id=session_id))
-            else:
-                flash("Failed to submit response", "error")
+        # Show how the user's last submission went, once
+        submission = submissions.current(session_id, user_has_responded or None)
+        if submission is not None:
+            if submission["state"] == submissions.DONE:
+                user_has_responded = True
+            if submission["state"] != submissions.PENDING and not submission["acknowledged"]:
+                if submission["state"] == submissions.DONE:
+                    flash("Response submitted successfully", "success")
+                else:
+                    flash("Failed to submit response", "error")
+                submissions.acknowledge(session_id, submission)
         
-        return render_template(
+        render = stream_page if stream else render_template
+        return render(
             "standup/view_session.html", 
             standup_session=standup_session,
             responses=responses, 
             user_has_responded=user_has_responded,
-            timezone=standup_timezone
+            submission=submission,
+            timezone=standup_timezone,
+            next_cursor=next_cursor,
+            limit=limit,
+            live_updates=live.LIVE_UPDATES
         )
     
     except Exception as e:
         logger.error(f"Exception in view_session route: {str(e)}")
         flash(f"An error occurred while loading the session", "error")
         return redirect(url_for("standup.dashboard"))
+
+
+@bp.route("/sessions/<int:session_id>/responses")
+@login_required
+def responses_page(session_id):
+    offset, last_id, limit = page_args(request.args)
+    
+    session_response, responses_response = api_batch(
+        ("get", f"/sessions/{session_id}"),
+        ("get", f"/responses/session/{session_id}", {"params": page_params(offset, limit), "stream": True}),
+        token=session["token"]
+    )
     
+    if session_response.status_code != 200:
+        responses_response.close()
+        return "", 404
+    
+    standup_session = session_response.json()
+    responses, next_cursor = _load_page(responses_response, offset, last_id, limit)
+    next_url = next_cursor and url_for("standup.responses_page", session_id=session_id, cursor=next_cursor, limit=limit)
+    
+    return _rows_fragment(
+        "standup/response_rows.html",
+        next_url,
+        standup_session=standup_session,
+        responses=responses,
+        timezone=standup_session.get('standup', {}).get('timezone', 'UTC'),
+        next_cursor=next_cursor
+    )
+    
+
+@bp.route("/sessions/<int:session_id>/submission")
+@login_required
+def submission_status(session_id):
+    submission = submissions.current(session_id)
+    return jsonify({"state": submission["state"] if submission else None})
+
+
+@bp.route("/sessions/<int:session_id>/events")
+@login_required
+def session_events(session_id):
+    if not live.LIVE_UPDATES:
+        return "", 404
+    
+    # Checks this user may see the session; usually answered from the response cache
+    session_response = api_request_with_refresh("get", f"/sessions/{session_id}", token=session["token"])
+    if session_response.status_code != 200:
+        return "", 404
+    
+    return live.event_stream(
+        session_id,
+        session_response.json(),
+        session["token"],
+        request.headers.get("Last-Event-ID")
+    )
+
 
 @bp.route("/create_session/<int:standup_id>", methods=["POST"])
 @login_required
@@ -249,7 +430,7 @@ def create_session(standup_id):
     # Check if user is facilitator or admin
     if standup["facilitator_id"] != session["user_id"] and session["user_role"] != "admin":
         flash("Only the facilitator or admin can create sessions", "error")
-        return redirect(url_for("standup.view_standup", standup_id=standup_id))
+        return redirect(url_for("standup.view", standup_id=standup_id))
     
     # Create a new session
     session_date = request.form.get("session_date")
@@ -270,4 +451,82 @@ def create_session(standup_id):
         error_data = response.json()
         flash(f"Failed to create session: {error_data.get('detail', 'Unknown error')}", "error")
     
-    return redirect(url_for("standup.view_standup", standup_id=standup_id))
+    return redirect(url_for("standup.view", standup_id=standup_id))
+
+
+@bp.route("/<int:standup_id>/schedule", methods=["POST"])
+@login_required
+def schedule_sessions(standup_id):
+    # Get standup details and its existing sessions concurrently
+    standup_response, sessions_response = api_batch(
+        ("get", f"/standups/{standup_id}"),
+        ("get", f"/sessions/standup/{standup_id}", {"stream": True}),
+        token=session["token"]
+    )
+    
+    if standup_response.status_code != 200:
+        sessions_response.close()
+        flash("Standup not found", "error")
+        return redirect(url_for("standup.dashboard"))
+    
+    standup = standup_response.json()
+    
+    # Check if user is facilitator or admin
+    if standup["facilitator_id"] != session["user_id"] and session["user_role"] != "admin":
+        sessions_response.close()
+        flash("Only the facilitator or admin can create sessions", "error")
+        return redirect(url_for("standup.view", standup_id=standup_id))
+    
+    try:
+        meetings = expand_schedule(standup, request.form.get("start_date"), request.form.get("end_date"))
+    except (TypeError, ValueError) as e:
+        sessions_response.close()
+        flash(f"Failed to schedule sessions: {e}", "error")
+        return redirect(url_for("standup.view", standup_id=standup_id))
+    
+    # Skip meetings that already have a session
+    existing = set()
+    if sessions_response.status_code == 200:
+        existing = {session_minute(s.get("date")) for s in iter_json_array(sessions_response)}
+    else:
+        sessions_response.close()
+    
+    results = []
+    calls = []
+    for meeting in meetings:
+        date = meeting.strftime(API_DATETIME_FORMAT)
+        if session_minute(date) in existing:
+            results.append({"date": date, "status": "skipped", "detail": "A session already exists"})
+        else:
+            results.append({"date": date, "status": "pending"})
+            calls.append(("post", "/sessions/", {"data": {"standup_id": standup_id, "date": date}}))
+    
+    # Create the sessions a few at a time
+    responses = iter(api_pipeline(calls, token=session["token"], concurrency=BULK_CONCURRENCY, rate=BULK_RATE))
+    for result in results:
+        if result["status"] != "pending":
+            continue
+        
+        response = next(responses)
+        if response.status_code == 200:
+            result["status"] = "created"
+            result["session_id"] = response.json().get("id")
+        else:
+            try:
+                detail = response.json().get("detail", "Unknown error")
+            except ValueError:
+                detail = "Unknown error"
+            result["status"] = "failed"
+            result["detail"] = detail
+    
+    counts = {status: sum(1 for r in results if r["status"] == status) for status in ("created", "skipped", "failed")}
+    
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(standup_id=standup_id, counts=counts, results=results)
+    
+    return render_template(
+        "standup/schedule_results.html",
+        standup=standup,
+        results=results,
+        counts=counts
+    )
@@ -0,0 +1,58 @@
+from flask import Response, current_app, g, get_flashed_messages, stream_template
+from markupsafe import Markup
+import os
+
+# Enable streamed rendering for the long session/response pages
+STREAM_PAGES = os.getenv("STREAM_PAGES", "false").lower() == "true"
+# Bytes of rendered HTML collected before a chunk is sent
+STREAM_BUFFER_SIZE = int(os.getenv("STREAM_BUFFER_SIZE", "16384"))
+
+FLUSH_MARKER = "<!-- stream:flush -->"
+
+
+def stream_flush():
+    """Template global marking a point where streamed output is sent right away"""
+    if g.get("streaming"):
+        return Markup(FLUSH_MARKER)
+    return ""
+
+
+def _buffered(chunks, size):
+    """Join small template chunks, sending early at flush markers"""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        if chunk == FLUSH_MARKER:
+            if buffer:
+                yield "".join(buffer)
+                buffer = []
+                length = 0
+            continue
+
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buffer)
+            buffer = []
+            length = 0
+
+    if buffer:
+        yield "".join(buffer)
+
+
+def streaming_enabled():
+    return current_app.config.get("STREAM_PAGES", STREAM_PAGES)
+
+
+def stream_page(template_name, **context):
+    """Render a template as a streamed response
+
+    The response headers (and session cookie) are sent before the template
+    runs, so flashed messages are taken from the session up front.
+    """
+    g.streaming = True
+    get_flashed_messages(with_categories=True)
+
+    chunks = stream_template(template_name, **context)
+    size = current_app.config.get("STREAM_BUFFER_SIZE", STREAM_BUFFER_SIZE)
+    return Response(_buffered(chunks, size), mimetype="text/html")
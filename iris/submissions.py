@@ -0,0 +1,280 @@
+"""Standup response submissions, delivered in the background
+
+A submission is keyed by user and session, and that key is sent to the
+API as an Idempotency-Key. A user can have only one submission per
+session: a repeat is refused from what this worker already knows. That
+means its own records, the session's responded-user set, and a marker
+kept in the user's Flask session, which every worker sees. The POST is
+queued for a background worker, and the browser is redirected right
+away. The page shows the submission as pending until it lands or fails.
+"""
+from . import cache, metrics
+from .helpers import api_request, exchange_refresh_token, iter_json_array
+from .summary import invalidate as invalidate_summary
+from .tokens import token_identity
+from flask import session
+from iris import logger
+import hashlib
+import os
+import queue
+import threading
+import time
+
+# Hand response submissions to background workers and redirect right away
+SUBMIT_ASYNC = os.getenv("SUBMIT_ASYNC", "true").lower() == "true"
+# Background workers delivering submissions in each process
+SUBMIT_WORKERS = int(os.getenv("SUBMIT_WORKERS", "2"))
+# Submissions waiting for a worker; past this, new ones are delivered before redirecting
+SUBMIT_QUEUE_SIZE = int(os.getenv("SUBMIT_QUEUE_SIZE", "500"))
+# Attempts to deliver a submission, and seconds before the first retry (doubled after each)
+SUBMIT_ATTEMPTS = int(os.getenv("SUBMIT_ATTEMPTS", "4"))
+SUBMIT_RETRY_BACKOFF = float(os.getenv("SUBMIT_RETRY_BACKOFF", "0.5"))
+# Seconds a submission is remembered, refusing repeats; older ones are forgotten
+SUBMIT_TTL = int(os.getenv("SUBMIT_TTL", "600"))
+# Seconds a session's set of users who responded is trusted, and how many sessions each worker keeps
+RESPONDED_TTL = int(os.getenv("RESPONDED_TTL", "300"))
+RESPONDED_MAX_SESSIONS = int(os.getenv("RESPONDED_MAX_SESSIONS", "1024"))
+# Seconds between checks of the API for a submission another worker took
+SUBMIT_RECHECK = float(os.getenv("SUBMIT_RECHECK", "5"))
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+# Flask session key: {session id: [idempotency key, submitted at, outcome shown]}
+MARKERS = "submissions"
+
+_records = cache.MemoryBackend(max(SUBMIT_QUEUE_SIZE * 2, 1024))  # idempotency key -> record
+_records_lock = threading.Lock()
+_responded = cache.MemoryBackend(RESPONDED_MAX_SESSIONS)  # session id -> (fetched at, set of user ids)
+
+_queue = None
+_queue_pid = None
+_queue_lock = threading.Lock()
+
+
+def idempotency_key(token, session_id):
+    """The key identifying a user's one response to a session"""
+    return hashlib.sha256(f"{token_identity(token)}/{session_id}".encode("utf-8")).hexdigest()[:32]
+
+
+def remember_responses(session_id, user_ids):
+    """Record the full set of users who responded to a session"""
+    _responded.set(str(session_id), (time.time(), set(user_ids)), RESPONDED_TTL)
+
+
+def _mark_responded(session_id, user_id):
+    cached = _responded.get(str(session_id))
+    if cached is not None:
+        cached[1].add(user_id)
+
+
+def responded_users(session_id, token, max_age=RESPONDED_TTL):
+    """Return the ids of users who responded to a session, fetched if not known within max_age seconds"""
+    cached = _responded.get(str(session_id))
+    if cached is not None and time.time() - cached[0] <= max_age:
+        return cached[1]
+
+    response = api_request("get", f"/responses/session/{session_id}", token=token, use_cache=False, stream=True)
+    if response.status_code != 200:
+        response.close()
+        return set()
+    users = {item.get("user_id") for item in iter_json_array(response)}
+    remember_responses(session_id, users)
+    return users
+
+
+def _get_queue():
+    """Return this process's submission queue, starting its workers on first use"""
+    global _queue, _queue_pid
+
+    pid = os.getpid()
+    if _queue is None or _queue_pid != pid:
+        with _queue_lock:
+            if _queue is None or _queue_pid != pid:
+                _queue = queue.Queue(maxsize=SUBMIT_QUEUE_SIZE)
+                _queue_pid = pid
+                for i in range(max(1, SUBMIT_WORKERS)):
+                    threading.Thread(target=_work, args=(_queue,), name=f"iris-submit-{i}", daemon=True).start()
+    return _queue
+
+
+def _work(submissions):
+    while True:
+        record = submissions.get()
+        try:
+            deliver(record)
+        except Exception as e:
+            logger.error(f"Delivering response to session {record['session_id']} failed: {str(e)}")
+            _finish(record, FAILED)
+
+
+def _has_landed(record):
+    users = responded_users(record["session_id"], record["token"], max_age=0)
+    return record["user_id"] in users
+
+
+def _finish(record, state):
+    record["state"] = state
+    if state == DONE:
+        _mark_responded(record["session_id"], record["user_id"])
+        invalidate_summary(record["token"])
+    # Credentials aren't kept any longer than the delivery needs them
+    record["token"] = None
+    record["refresh_token"] = None
+    metrics.submission("delivered" if state == DONE else "failed")
+
+
+def _post(record):
+    return api_request(
+        "post",
+        "/responses/",
+        data=record["data"],
+        token=record["token"],
+        headers={"Idempotency-Key": record["key"]},
+    )
+
+
+def deliver(record):
+    """POST a submission, retrying while the API fails or can't be reached
+
+    Before a retry the session's responses are checked for the user, so a
+    write that landed before the failure is not sent again. A token that
+    expired while the submission waited is refreshed once, as
+    api_request_with_refresh does.
+    """
+    delay = SUBMIT_RETRY_BACKOFF
+    refreshed = False
+    for attempt in range(1, SUBMIT_ATTEMPTS + 1):
+        record["attempts"] = attempt
+        response = _post(record)
+        if response.status_code == 401 and not refreshed:
+            refreshed = True
+            token_data = exchange_refresh_token(record["refresh_token"])
+            if token_data is not None:
+                response.close()
+                record["token"] = token_data["access_token"]
+                record["refresh_token"] = token_data.get("refresh_token", record["refresh_token"])
+                response = _post(record)
+        status = response.status_code
+        response.close()
+
+        if 200 <= status < 300 or status == 409:
+            _finish(record, DONE)
+            return
+        if status < 500 and status not in (408, 429):
+            # Rejected (invalid, expired token, ...): sending it again won't help
+            logger.warning(f"Response to session {record['session_id']} was rejected with {status}")
+            _finish(record, FAILED)
+            return
+        if _has_landed(record):
+            _finish(record, DONE)
+            return
+
+        if attempt < SUBMIT_ATTEMPTS:
+            metrics.submission("retried")
+            time.sleep(delay)
+            delay *= 2
+
+    logger.error(f"Response to session {record['session_id']} failed after {SUBMIT_ATTEMPTS} attempts ({status})")
+    _finish(record, FAILED)
+
+
+def _markers():
+    """The user's submission markers, less those older than SUBMIT_TTL"""
+    now = time.time()
+    return {sid: marker for sid, marker in session.get(MARKERS, {}).items() if now - marker[1] <= SUBMIT_TTL}
+
+
+def current(session_id, responded=None):
+    """Return the current user's submission to a session, or None
+
+    The result has the submission's "key", its "state" (pending, done or
+    failed), whether that outcome was "acknowledged" (shown to the user)
+    and, when this worker took it, the submitted "data". A submission
+    taken by another worker is done once the user shows up among the
+    session's responses (`responded`, or else looked up at most once per
+    SUBMIT_RECHECK). Submissions older than SUBMIT_TTL are forgotten.
+    """
+    marker = _markers().get(str(session_id))
+    if marker is None:
+        return None
+
+    key, submitted_at, acknowledged = marker
+    record = _records.get(key)
+    if record is not None:
+        state = record["state"]
+    else:
+        if responded is None:
+            users = responded_users(session_id, session["token"], max_age=SUBMIT_RECHECK)
+            responded = session.get("user_id") in users
+        state = DONE if responded else PENDING
+
+    return {
+        "key": key,
+        "state": state,
+        "acknowledged": acknowledged,
+        "data": record["data"] if record is not None else None,
+    }
+
+
+def acknowledge(session_id, submission):
+    """Note that the outcome of a submission was shown to the user
+
+    A failed submission is forgotten, so it can be sent again. A delivered
+    one keeps its marker, so it stays a duplicate on every worker.
+    """
+    markers = _markers()
+    if submission["state"] == FAILED:
+        markers.pop(str(session_id), None)
+        _records.delete_prefix(submission["key"])
+    elif str(session_id) in markers:
+        markers[str(session_id)] = markers[str(session_id)][:2] + [True]
+    session[MARKERS] = markers
+
+
+def submit(session_id, data, token):
+    """Take the current user's response to a session; return whether it was accepted
+
+    A repeat of a submission that is pending or done, or a submission from
+    a user who already responded, is not accepted. Otherwise it is queued
+    (or, with SUBMIT_ASYNC off or the queue full, delivered right away)
+    and the user's Flask session is marked so every worker knows of it.
+    """
+    user_id = session.get("user_id")
+    key = idempotency_key(token, session_id)
+
+    existing = current(session_id)
+    if (existing is not None and existing["state"] != FAILED) or user_id in responded_users(session_id, token):
+        metrics.submission("duplicate")
+        return False
+
+    with _records_lock:
+        record = _records.get(key)
+        if record is not None and record["state"] != FAILED:
+            metrics.submission("duplicate")
+            return False
+        record = {
+            "key": key,
+            "session_id": session_id,
+            "user_id": user_id,
+            "data": dict(data, session_id=session_id),
+            "token": token,
+            "refresh_token": session.get("refresh_token"),
+            "state": PENDING,
+            "attempts": 0,
+        }
+        _records.set(key, record, SUBMIT_TTL)
+
+    markers = _markers()
+    markers[str(session_id)] = [key, time.time(), False]
+    session[MARKERS] = markers
+
+    if SUBMIT_ASYNC:
+        try:
+            _get_queue().put_nowait(record)
+            return True
+        except queue.Full:
+            logger.warning("Submission queue is full, delivering before redirecting")
+    deliver(record)
+    return True
@@ -0,0 +1,160 @@
+from . import cache
+from .helpers import api_pipeline, iter_json_array, iter_pipeline
+from .timezones import UTC, parse_datetime
+from .tokens import token_identity
+from datetime import datetime
+from flask import session
+import os
+
+# Seconds a user's dashboard summary is reused before it's rebuilt
+SUMMARY_TTL = int(os.getenv("SUMMARY_TTL", "30"))
+# Backend calls in flight at once while a summary is built
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+# Users whose summary each worker keeps
+SUMMARY_MAX_USERS = int(os.getenv("SUMMARY_MAX_USERS", "1024"))
+
+# Blocker answers that mean there are none
+NO_BLOCKERS = {"", "-", "n/a", "na", "no", "none", "nothing", "no blockers", "nope"}
+
+_summaries = cache.MemoryBackend(SUMMARY_MAX_USERS)
+
+
+def _key(token):
+    return f"{token_identity(token)}/summary"
+
+
+def _session_start(standup_session):
+    """A session's date as a naive UTC datetime, or None if it has none"""
+    try:
+        start = parse_datetime(standup_session.get("date") or "")
+    except ValueError:
+        return None
+    if start.tzinfo is not None:
+        start = start.astimezone(UTC).replace(tzinfo=None)
+    return start
+
+
+def latest_session(sessions, now):
+    """Return the session that started most recently, ignoring ones scheduled ahead"""
+    latest = None
+    latest_start = None
+    for standup_session in sessions:
+        start = _session_start(standup_session)
+        if start is not None and start <= now and (latest_start is None or start > latest_start):
+            latest, latest_start = standup_session, start
+    return latest
+
+
+def has_blocker(response):
+    text = (response.get("blockers") or "").strip().lower().rstrip(".!")
+    return text not in NO_BLOCKERS
+
+
+def aggregate(standups, latest, responses):
+    """Build the per-standup summaries in one pass over every response
+
+    latest maps a standup id to its latest session (or None), responses
+    maps a session id to that session's responses. Returns {standup id:
+    {"session", "responded", "expected", "missing", "blockers"}}, where
+    missing and blockers list members by username.
+    """
+    summaries = {}
+    by_session = {}
+    for standup in standups:
+        standup_session = latest.get(standup["id"])
+        summary = summaries[standup["id"]] = {
+            "session": standup_session,
+            "responded": 0,
+            "expected": len(standup.get("members") or []),
+            "missing": [],
+            "blockers": [],
+            "_users": set(),
+        }
+        if standup_session is not None:
+            by_session[standup_session["id"]] = summary
+
+    for session_id, items in responses.items():
+        summary = by_session.get(session_id)
+        if summary is None:
+            continue
+        for response in items:
+            summary["_users"].add(response.get("user_id"))
+            if has_blocker(response):
+                user = response.get("user") or {}
+                summary["blockers"].append({
+                    "username": user.get("username", f"User {response.get('user_id')}"),
+                    "text": response["blockers"].strip(),
+                })
+
+    for standup in standups:
+        summary = summaries[standup["id"]]
+        users = summary.pop("_users")
+        summary["responded"] = len(users)
+        if summary["session"] is not None:
+            summary["missing"] = [
+                member.get("username") for member in standup.get("members") or []
+                if member.get("id") not in users
+            ]
+    return summaries
+
+
+def dashboard_summary(token, standups, now=None):
+    """Return the user's standup summaries, built at most once per SUMMARY_TTL
+
+    Every standup's sessions are fetched, then the responses to each latest
+    session, SUMMARY_CONCURRENCY calls at a time. The API's listing order
+    isn't relied on: each sessions listing is read as it downloads, keeping
+    only the latest session by date, and closed before the next is handed
+    out, so no more than SUMMARY_CONCURRENCY connections are held. A
+    standup whose calls fail has no session in its summary, and a summary
+    with failed calls isn't cached.
+    """
+    key = _key(token)
+    summaries = _summaries.get(key)
+    if summaries is not None:
+        return summaries
+
+    now = now or datetime.now(UTC).replace(tzinfo=None)
+    standups = [standup for standup in standups if standup.get("id") is not None]
+
+    sessions_responses = iter_pipeline(
+        (
+            ("get", f"/sessions/standup/{standup['id']}", {"stream": True})
+            for standup in standups
+        ),
+        token=token,
+        concurrency=SUMMARY_CONCURRENCY,
+    )
+    latest = {}
+    complete = True
+    for standup, response in zip(standups, sessions_responses):
+        if response.status_code == 200:
+            latest[standup["id"]] = latest_session(iter_json_array(response), now)
+        else:
+            response.close()
+            complete = False
+
+    pending = [(standup_id, standup_session) for standup_id, standup_session in latest.items() if standup_session]
+    # The first pipeline may have refreshed the token
+    responses_responses = api_pipeline(
+        [("get", f"/responses/session/{standup_session['id']}") for _, standup_session in pending],
+        token=session.get("token", token),
+        concurrency=SUMMARY_CONCURRENCY,
+    )
+    responses = {}
+    for (standup_id, standup_session), response in zip(pending, responses_responses):
+        if response.status_code == 200:
+            responses[standup_session["id"]] = response.json()
+        else:
+            latest[standup_id] = None
+            complete = False
+
+    summaries = aggregate(standups, latest, responses)
+    if complete:
+        _summaries.set(key, summaries, SUMMARY_TTL)
+    return summaries
+
+
+def invalidate(token):
+    """Drop the user's cached summary, e.g. after they respond to a session"""
+    _summaries.delete_prefix(_key(token))
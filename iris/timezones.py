@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from markupsafe import Markup, escape
+
+DEFAULT_FORMAT = '%Y-%m-%d %I:%M %p'
+UTC = timezone.utc
+
+_options_html = None
+_selected_offsets = None
+
+
+def _pytz():
+    # Imported on first use: pytz and its zone list add to every worker's cold start
+    import pytz
+    return pytz
+
+
+def is_timezone(name):
+    """Return whether name is a timezone pytz knows"""
+    return name in _pytz().all_timezones_set
+
+
+def _build_options():
+    """Render the <option> list for every timezone once and index each entry"""
+    global _options_html, _selected_offsets
+
+    parts = []
+    offsets = {}
+    length = 0
+    for tz in _pytz().all_timezones:
+        value = str(escape(tz))
+        prefix = f'<option value="{value}"'
+        offsets[tz] = length + len(prefix)
+        option = f'{prefix}>{value}</option>\n'
+        parts.append(option)
+        length += len(option)
+
+    _selected_offsets = offsets
+    _options_html = "".join(parts)
+
+
+def timezone_options(selected=None):
+    """Return the cached timezone <option> markup with `selected` marked"""
+    if _options_html is None:
+        _build_options()
+
+    offset = _selected_offsets.get(selected)
+    if offset is None:
+        return Markup(_options_html)
+    return Markup(_options_html[:offset] + " selected" + _options_html[offset:])
+
+
+@lru_cache(maxsize=None)
+def get_timezone(name):
+    """Return the pytz timezone object for a name, memoized"""
+    return _pytz().timezone(name)
+
+
+@lru_cache(maxsize=8192)
+def parse_datetime(value):
+    """Parse an ISO 8601 string from the API, memoized"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _convert(value, source_tz, target_tz, format):
+    # If the datetime has no timezone info, assume it's in source_tz
+    if value.tzinfo is None:
+        value = get_timezone(source_tz).localize(value)
+
+    # Convert to target timezone and format it
+    return value.astimezone(get_timezone(target_tz)).strftime(format)
+
+
+@lru_cache(maxsize=8192)
+def _convert_string(value, source_tz, target_tz, format):
+    if not (is_timezone(source_tz) and is_timezone(target_tz)):
+        return value
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        return value
+    return _convert(parsed, source_tz, target_tz, format)
+
+
+def convert_timezone(value, source_tz='UTC', target_tz='UTC', format=DEFAULT_FORMAT):
+    """Convert datetime from one timezone to another and format it
+
+    Values it can't convert, including ones in or to an unknown timezone,
+    are returned as they are.
+    """
+    if isinstance(value, str):
+        return _convert_string(value, source_tz, target_tz, format)
+
+    if isinstance(value, datetime) and is_timezone(source_tz) and is_timezone(target_tz):
+        return _convert(value, source_tz, target_tz, format)
+
+    return value
@@ -0,0 +1,68 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+
+def _b64decode(part):
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+
+def token_claims(token):
+    """Return the (unverified) claims of a JWT, or {} if it can't be decoded"""
+    if not token:
+        return {}
+
+    try:
+        claims = json.loads(_b64decode(token.split(".")[1]))
+    except (IndexError, ValueError):
+        return {}
+
+    return claims if isinstance(claims, dict) else {}
+
+
+def verified_claims(token, secret):
+    """Return the claims of an unexpired HS256 JWT signed with secret, or None"""
+    if not token or not secret:
+        return None
+
+    try:
+        header, payload, signature = token.split(".")
+        if json.loads(_b64decode(header)).get("alg") != "HS256":
+            return None
+        signature = _b64decode(signature)
+        signing_input = f"{header}.{payload}".encode("ascii")
+    except (AttributeError, ValueError):
+        return None
+
+    expected = hmac.new(secret.encode("utf-8"), signing_input, hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, signature):
+        return None
+
+    claims = token_claims(token)
+    expiry = token_expiry(token)
+    if not claims or (expiry is not None and expiry < time.time()):
+        return None
+    return claims
+
+
+def token_expiry(token):
+    """Return the exp claim of a JWT as a timestamp, or None if it has none"""
+    expiry = token_claims(token).get("exp")
+    if isinstance(expiry, (int, float)) and not isinstance(expiry, bool):
+        return expiry
+    return None
+
+
+def token_identity(token):
+    """Return a stable identifier for the user a token belongs to"""
+    if not token:
+        return "anonymous"
+
+    subject = token_claims(token).get("sub")
+    if subject is not None:
+        return f"sub:{subject}"
+
+    # Opaque tokens: fall back to a digest so the token itself is never stored
+    return "tok:" + hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
@@ -0,0 +1,102 @@
+"""Cold start helpers: on-disk template bytecode and a worker warm-up
+
+Jinja compiles a template to Python the first time it's rendered. With
+TEMPLATE_CACHE on, the compiled code is kept on disk, in a directory only
+this user can write to (TEMPLATE_CACHE_DIR, or Jinja's private per-user
+directory under the temp dir), so after `python -m iris.warmup` (run by startup.sh) workers load bytecode
+instead of compiling. With WARM_UP on, create_app() also loads every
+template and the timezone list up front (shared by all workers under
+gunicorn --preload), and gunicorn.conf.py opens the backend connections
+in each worker before it accepts requests.
+
+    python -m iris.warmup
+"""
+from jinja2 import FileSystemBytecodeCache
+from iris import logger
+import os
+import stat
+import time
+
+# Keep compiled templates on disk, shared by every worker and restart
+TEMPLATE_CACHE = os.getenv("TEMPLATE_CACHE", "false").lower() == "true"
+# Unset: Jinja's private per-user directory. The bytecode is loaded and run, so a directory
+# other users can write to is refused
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR")
+# Load templates and timezone data at startup and open backend connections before serving
+WARM_UP = os.getenv("WARM_UP", "false").lower() == "true"
+# Backend connections each worker opens when warming up
+WARM_UP_CONNECTIONS = int(os.getenv("WARM_UP_CONNECTIONS", "2"))
+
+
+def init_app(app):
+    """Attach the bytecode cache, and warm the app up when enabled"""
+    app.config.setdefault("TEMPLATE_CACHE", TEMPLATE_CACHE)
+    app.config.setdefault("TEMPLATE_CACHE_DIR", TEMPLATE_CACHE_DIR)
+    app.config.setdefault("WARM_UP", WARM_UP)
+
+    if app.config["TEMPLATE_CACHE"]:
+        directory = app.config["TEMPLATE_CACHE_DIR"]
+        if directory is None:
+            # Creates <tmp>/_jinja2-cache-<uid> with mode 0700 and checks who owns it
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+        elif _private_dir(directory):
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+        else:
+            logger.warning(f"Not caching template bytecode in {directory}: other users can write to it")
+
+    if app.config["WARM_UP"]:
+        warm_up(app)
+
+
+def _private_dir(path):
+    """Create path (mode 0700) if needed; return whether only this user can write to it"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    return stat.S_ISDIR(info.st_mode) and info.st_uid == os.getuid() and not info.st_mode & 0o022
+
+
+def load_templates(app):
+    """Compile (or load from the bytecode cache) every template; return how many"""
+    names = [name for name in app.jinja_env.list_templates() if name.endswith(".html")]
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def warm_up(app):
+    """Load the templates and timezone data this process will need"""
+    from . import timezones
+
+    start = time.perf_counter()
+    count = load_templates(app)
+    timezones.timezone_options()
+    timezones.get_timezone("UTC")
+    logger.info(f"Warmed up {count} templates in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def warm_backend(connections=WARM_UP_CONNECTIONS):
+    """Open backend connections for this worker; call after the fork"""
+    from . import helpers
+
+    start = time.perf_counter()
+    opened = helpers.warm_pool(connections)
+    logger.info(f"Opened {opened}/{connections} backend connections in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def main():
+    from iris import create_app
+
+    app = create_app()
+    if not app.config["TEMPLATE_CACHE"]:
+        print("TEMPLATE_CACHE is off, nothing to precompile")
+        return
+    count = load_templates(app)
+    cache = app.jinja_env.bytecode_cache
+    if cache is None:
+        print("No usable template cache directory, nothing to precompile")
+        return
+    print(f"Compiled {count} templates into {cache.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
 #!/bin/bash
 
-# Install dependencies
-pip install -r requirements.txt
+# Install dependencies, unless requirements.txt is unchanged since the last install
+stamp="$(python -c 'import sys; print(sys.prefix)')/.iris-requirements.sha256"
+if ! sha256sum --check --status "$stamp" 2>/dev/null; then
+    pip install -r requirements.txt && sha256sum requirements.txt > "$stamp"
+fi
+
+# Build the fingerprinted, precompressed static assets
+python -m iris.assets
+
+# Compile the templates to bytecode so workers don't compile them on first use
+python -m iris.warmup
 
 # Start the application
 gunicorn --bind=0.0.0.0 --timeout 600 run:app
@@ -0,0 +1,58 @@
+"""Fixtures running the app against the local stub API (benchmarks/stub_api.py)"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("API_URL", "http://127.0.0.1:1")
+
+from benchmarks.stub_api import StubData, create_stub_app, start_stub_server
+from iris import cache, create_app, helpers
+import pytest
+
+
+@pytest.fixture
+def make_stub():
+    """Start a stub API with the given StubData and create_stub_app options
+
+    before_request and after_request are registered on the stub, to make it
+    fail or count calls.
+    """
+    servers = []
+
+    def start(data=None, before_request=None, after_request=None, **options):
+        data = data or StubData(standups=2, sessions=5, responses=5)
+        stub_app = create_stub_app(data, **options)
+        if before_request is not None:
+            stub_app.before_request(before_request)
+        if after_request is not None:
+            stub_app.after_request(after_request)
+        server = start_stub_server(stub_app)
+        server.data = data
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def stub(make_stub):
+    return make_stub()
+
+
+@pytest.fixture
+def app(stub, monkeypatch):
+    monkeypatch.setattr(helpers, "API_URL", stub.url)
+    # Per-worker state would otherwise carry over between tests
+    monkeypatch.setattr(cache, "response_cache", cache.create_cache("memory"))
+    helpers._breakers.clear()
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post("/login", data={"username": "user1", "password": "password"})
+    return client
@@ -0,0 +1,36 @@
+from iris.helpers import CircuitBreaker
+
+
+def open_breaker():
+    breaker = CircuitBreaker("/standups/", window=60, min_calls=2, failure_rate=0.5, cooldown=0, probes=1)
+    for _ in range(2):
+        breaker.record(breaker.allow(), True)
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_probe_outcome_closes_breaker():
+    breaker = open_breaker()
+
+    probe = breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is None
+
+    breaker.record(probe, False)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_call_from_before_opening_is_not_a_probe():
+    breaker = CircuitBreaker("/standups/", window=60, min_calls=2, failure_rate=0.5, cooldown=0, probes=1)
+    slow = breaker.allow()
+    for _ in range(2):
+        breaker.record(breaker.allow(), True)
+    probe = breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # A call let through while closed finishes during the probe
+    breaker.record(slow, False)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.record(probe, True)
+    assert breaker.state == CircuitBreaker.OPEN
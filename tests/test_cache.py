@@ -0,0 +1,106 @@
+from benchmarks.stub_api import make_token
+from iris import cache, helpers
+from iris.helpers import CachedResponse, api_request
+import pytest
+import requests
+
+
+@pytest.fixture
+def stats(stub):
+    return stub.app.config["STUB_STATS"]
+
+
+@pytest.fixture
+def expiring_cache(monkeypatch):
+    """A response cache whose entries are stale as soon as they're stored"""
+    response_cache = cache.ResponseCache(cache.MemoryBackend(), ttls={"/standups/": 0})
+    monkeypatch.setattr(cache, "response_cache", response_cache)
+    return response_cache
+
+
+def test_miss_then_hit(app, stats):
+    token = make_token(1)
+
+    first = api_request("get", "/standups/1", token=token)
+    requests_after_miss = stats["requests"]
+    second = api_request("get", "/standups/1", token=token)
+
+    assert isinstance(second, CachedResponse)
+    assert second.json() == first.json()
+    assert stats["requests"] == requests_after_miss
+
+
+def test_hits_are_per_user(app, stats):
+    api_request("get", "/standups/1", token=make_token(1))
+    requests_after_first_user = stats["requests"]
+    api_request("get", "/standups/1", token=make_token(2))
+
+    assert stats["requests"] == requests_after_first_user + 1
+
+
+def test_stale_entry_is_revalidated(app, stats, expiring_cache, monkeypatch):
+    token = make_token(1)
+    first = api_request("get", "/standups/1", token=token)
+
+    closed = []
+    close = requests.Response.close
+    monkeypatch.setattr(requests.Response, "close", lambda self: closed.append(self) or close(self))
+    second = api_request("get", "/standups/1", token=token, stream=True)
+
+    assert stats["not_modified"] == 1
+    assert isinstance(second, CachedResponse)
+    assert second.json() == first.json()
+    # The streamed 304 went back to the pool
+    assert any(response.status_code == 304 for response in closed)
+
+
+def test_stale_entry_served_when_api_is_unreachable(app, expiring_cache, monkeypatch):
+    token = make_token(1)
+    first = api_request("get", "/standups/1", token=token)
+
+    monkeypatch.setattr(helpers, "API_URL", "http://127.0.0.1:1")
+    second = api_request("get", "/standups/1", token=token)
+
+    assert isinstance(second, CachedResponse)
+    assert second.status_code == 200
+    assert second.json() == first.json()
+
+
+def test_unreachable_api_without_cache_entry(app, monkeypatch):
+    monkeypatch.setattr(helpers, "API_URL", "http://127.0.0.1:1")
+
+    assert api_request("get", "/standups/1", token=make_token(1)).status_code == 503
+
+
+def test_write_invalidates_listing(app, stats):
+    token = make_token(1)
+    api_request("get", "/responses/session/1", token=token)
+    api_request("post", "/responses/", data={"session_id": 1, "yesterday": "y", "today": "t", "blockers": ""},
+                token=token)
+    requests_before = stats["requests"]
+    api_request("get", "/responses/session/1", token=token)
+
+    assert stats["requests"] == requests_before + 1
+
+
+def test_sqlite_backend_stores_json(tmp_path):
+    backend = cache.SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+    entry = {"content": b"[1, 2]", "decoded": ([1, 2],), "headers": {"ETag": '"1"'}}
+    backend.set("/standups/|", entry, 60)
+
+    stored = backend._connect().execute("SELECT value FROM api_cache").fetchone()[0]
+    assert stored.startswith("{")
+    value = backend.get("/standups/|")
+    assert value["content"] == b"[1, 2]"
+    assert value["decoded"][0] == [1, 2]
+    assert value["headers"] == {"ETag": '"1"'}
+
+
+def test_sqlite_backend_ignores_foreign_rows(tmp_path):
+    backend = cache.SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+    backend._connect().execute(
+        "INSERT INTO api_cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+        ("/standups/|", b"\x80\x05not json", 2 ** 40, 0)
+    )
+
+    assert backend.get("/standups/|") is None
@@ -0,0 +1,17 @@
+def test_page_is_compressed(client):
+    response = client.get("/standup/1", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.vary
+
+
+def test_not_modified_keeps_vary(client):
+    # The first page after logging in shows a flash message
+    client.get("/standup/1")
+    etag = client.get("/standup/1", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+
+    response = client.get("/standup/1", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert "Accept-Encoding" in response.vary
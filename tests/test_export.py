@@ -0,0 +1,34 @@
+from benchmarks.stub_api import StubData, make_token
+from iris import helpers
+from iris.export import iter_sessions
+
+
+def test_iter_sessions_whole_listing_of_one_page_and_extra_row(app, make_stub, monkeypatch):
+    # The API ignores skip/limit and has exactly page_size + 1 sessions
+    stub = make_stub(StubData(standups=1, sessions=11, responses=1))
+    monkeypatch.setattr(helpers, "API_URL", stub.url)
+
+    with app.test_request_context():
+        ids = [s["id"] for s in iter_sessions(1, make_token(1), page_size=10)]
+
+    assert ids == list(range(1, 12))
+
+
+def test_iter_sessions_pages(app, make_stub, monkeypatch):
+    stub = make_stub(StubData(standups=1, sessions=25, responses=1), paginate=True)
+    monkeypatch.setattr(helpers, "API_URL", stub.url)
+
+    with app.test_request_context():
+        ids = [s["id"] for s in iter_sessions(1, make_token(1), page_size=10)]
+
+    assert ids == list(range(1, 26))
+
+
+def test_export_csv(client, stub):
+    response = client.get("/standup/1/export?format=csv")
+    lines = response.get_data(as_text=True).splitlines()
+
+    assert response.mimetype == "text/csv"
+    assert lines[0].startswith("session_id,session_date")
+    assert len(lines) == 1 + 5 * 5
+    assert "2024-01-01T08:30:00-0600" in lines[1]
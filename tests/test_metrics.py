@@ -0,0 +1,63 @@
+import pytest
+import re
+
+
+@pytest.fixture
+def scrape(app, client):
+    app.config["METRICS_TOKEN"] = "scrape-token"
+
+    def get():
+        response = client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+        assert response.status_code == 200
+        return response.get_data(as_text=True)
+
+    return get
+
+
+def sample(text, name, **labels):
+    """The value of one sample in the exposition text, or None"""
+    wanted = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    pattern = rf"^{name}\{{{re.escape(wanted)}\}} (\S+)$" if wanted else rf"^{name} (\S+)$"
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def test_metrics_need_the_token(app, client):
+    app.config["METRICS_TOKEN"] = "scrape-token"
+
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 404
+
+
+def test_pool_hits_and_misses(client, scrape):
+    client.get("/standup/1")
+    client.get("/standup/1")
+
+    text = scrape()
+    assert sample(text, "iris_backend_pool_requests", result="miss") >= 1
+    assert sample(text, "iris_backend_pool_requests", result="hit") >= 1
+
+
+def test_cache_counters(client, scrape, monkeypatch):
+    from iris import cache
+    client.get("/standup/1")
+    client.get("/standup/1")
+    # Shrink the cache so the next page evicts
+    monkeypatch.setattr(cache.response_cache.backend, "max_entries", 1)
+    client.get("/standup/2")
+
+    text = scrape()
+    assert sample(text, "iris_api_cache_events", group="/standups/", event="hits") >= 1
+    assert sample(text, "iris_api_cache_events", group="/standups/", event="misses") >= 1
+    assert sample(text, "iris_api_cache_evictions") >= 1
+
+
+def test_breaker_states(client, scrape, monkeypatch):
+    from iris import helpers
+    client.get("/standup/1")
+    helpers.get_breaker("/standups/1")._open(0.0)
+
+    text = scrape()
+    assert sample(text, "iris_backend_breaker_state", endpoint="/standups/{id}", state="open") == 1
+    assert sample(text, "iris_backend_breaker_state", endpoint="/standups/{id}", state="closed") == 0
+    assert sample(text, "iris_backend_breaker_state", endpoint="/sessions/standup/{id}", state="closed") == 1
@@ -0,0 +1,49 @@
+from datetime import datetime
+from iris import scheduling
+from iris.scheduling import OccurrenceIndex
+import pytest
+
+
+def standup(standup_id, timezone):
+    return {"id": standup_id, "days_of_week": "0,1,2,3,4", "time_of_day": "09:30:00", "timezone": timezone}
+
+
+@pytest.fixture(autouse=True)
+def clear_indexes():
+    scheduling._indexes.clear()
+
+
+def test_unknown_timezone_skips_only_that_standup():
+    index = OccurrenceIndex(horizon_days=7)
+    now = datetime(2024, 1, 1)
+
+    index.update([standup(1, "US/Central"), standup(2, "Mars/Olympus")], now)
+
+    agenda = index.agenda(now)
+    assert agenda
+    assert {item[1]["id"] for item in agenda} == {1}
+
+
+def test_dashboard_with_unknown_timezone(client, stub):
+    stub.data.standups[2]["timezone"] = "Mars/Olympus"
+
+    page = client.get("/standup/dashboard").get_data(as_text=True)
+
+    assert "An error occurred" not in page
+    assert "Standup 1" in page
+    assert "Standup 2" in page
+
+
+def test_expand_schedule_rejects_unknown_timezone():
+    with pytest.raises(ValueError, match="Unknown timezone"):
+        scheduling.expand_schedule(standup(1, "Mars/Olympus"), "2024-01-01", "2024-01-07")
+
+
+def test_schedule_with_unknown_timezone_flashes(client, stub):
+    stub.data.standups[1]["timezone"] = "Mars/Olympus"
+
+    response = client.post("/standup/1/schedule", data={"start_date": "2024-03-01", "end_date": "2024-03-07"},
+                           follow_redirects=True)
+
+    assert response.status_code == 200
+    assert "Failed to schedule sessions: Unknown timezone: Mars/Olympus" in response.get_data(as_text=True)
@@ -0,0 +1,30 @@
+from iris import cache, create_app, helpers
+import pytest
+
+
+@pytest.fixture
+def login(stub, monkeypatch):
+    monkeypatch.setattr(helpers, "API_URL", stub.url)
+    monkeypatch.setattr(cache, "response_cache", cache.create_cache("memory"))
+
+    def start(session_backend):
+        app = create_app(session_backend=session_backend)
+        app.config["TESTING"] = True
+        client = app.test_client()
+        client.post("/login", data={"username": "user1", "password": "password"})
+        # The first page after logging in shows a flash message
+        client.get("/standup/1")
+        return client
+
+    return start
+
+
+def test_cache_headers_match_across_backends(login):
+    headers = {}
+    for backend in ("cookie", "memory"):
+        response = login(backend).get("/standup/1")
+        assert response.status_code == 200
+        headers[backend] = (response.headers.get("Cache-Control"), "Cookie" in response.vary)
+
+    assert headers["memory"] == headers["cookie"]
+    assert headers["cookie"] == ("private, no-cache", True)
@@ -0,0 +1,196 @@
+from benchmarks.stub_api import StubData, make_token
+from flask import request
+from iris import helpers, submissions
+import base64
+import json
+import pytest
+import requests
+import time
+
+FORM = {"yesterday": "y", "today": "t", "blockers": "none"}
+
+
+class Backend:
+    """What the stub saw of POST /responses/, and how it should answer"""
+
+    def __init__(self):
+        self.posts = []
+        self.delay = 0.0
+        self.fail = 0
+        self.fail_after_write = 0
+        self.reject = False
+        self.reject_expired = False
+
+    def before(self):
+        if request.method != "POST" or request.path != "/responses/":
+            return None
+        self.posts.append(request.headers.get("Idempotency-Key"))
+        time.sleep(self.delay)
+        if self.reject_expired and _expired(request.headers.get("Authorization", "")):
+            return {"detail": "Token expired"}, 401
+        if self.reject:
+            return {"detail": "Invalid response"}, 422
+        if self.fail:
+            self.fail -= 1
+            return {"detail": "Unavailable"}, 503
+        return None
+
+    def after(self, response):
+        if request.method == "POST" and request.path == "/responses/" and self.fail_after_write:
+            # The write landed, but the caller sees a failure
+            self.fail_after_write -= 1
+            response.status_code = 503
+        return response
+
+
+def _expired(authorization):
+    payload = authorization.split(".")[1]
+    payload += "=" * (-len(payload) % 4)
+    return json.loads(base64.urlsafe_b64decode(payload))["exp"] < time.time()
+
+
+@pytest.fixture
+def backend():
+    return Backend()
+
+
+@pytest.fixture
+def stub(make_stub, backend):
+    return make_stub(StubData(standups=1, sessions=3, responses=3), before_request=backend.before,
+                     after_request=backend.after)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(submissions, "SUBMIT_ASYNC", False)
+    monkeypatch.setattr(submissions, "SUBMIT_RETRY_BACKOFF", 0.0)
+    submissions._records.clear()
+    submissions._responded.clear()
+
+
+def my_rows(stub, session_id):
+    return [r for r in stub.data.responses[session_id] if r["user_id"] == 1]
+
+
+def wait_for_state(client, session_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = client.get(f"/standup/sessions/{session_id}/submission").json["state"]
+        if state != submissions.PENDING:
+            return state
+        time.sleep(0.05)
+    return submissions.PENDING
+
+
+def test_duplicate_post_sends_one_write(client, stub, backend, monkeypatch):
+    monkeypatch.setattr(submissions, "SUBMIT_ASYNC", True)
+    backend.delay = 0.3
+
+    start = time.monotonic()
+    assert client.post("/standup/sessions/1", data=FORM).status_code == 302
+    assert time.monotonic() - start < backend.delay
+    client.post("/standup/sessions/1", data=FORM)
+    assert client.get("/standup/sessions/1/submission").json["state"] == submissions.PENDING
+
+    assert wait_for_state(client, 1) == submissions.DONE
+    client.post("/standup/sessions/1", data=FORM)
+    assert len(backend.posts) == 1
+    assert len(my_rows(stub, 1)) == 1
+
+
+def test_idempotency_key_is_per_user_and_session():
+    token = make_token(1)
+    assert submissions.idempotency_key(token, 1) == submissions.idempotency_key(make_token(1, lifetime=60), 1)
+    assert submissions.idempotency_key(token, 1) != submissions.idempotency_key(token, 2)
+    assert submissions.idempotency_key(token, 1) != submissions.idempotency_key(make_token(2), 1)
+
+
+def test_server_errors_are_retried(client, stub, backend):
+    backend.fail = 2
+
+    client.post("/standup/sessions/1", data=FORM)
+
+    assert wait_for_state(client, 1) == submissions.DONE
+    assert len(backend.posts) == 3
+    assert len(set(backend.posts)) == 1
+    assert len(my_rows(stub, 1)) == 1
+
+
+def test_write_that_landed_is_not_sent_again(client, stub, backend):
+    backend.fail_after_write = 1
+
+    client.post("/standup/sessions/1", data=FORM)
+
+    assert wait_for_state(client, 1) == submissions.DONE
+    assert len(backend.posts) == 1
+    assert len(my_rows(stub, 1)) == 1
+
+
+def test_rejected_submission_can_be_sent_again(client, stub, backend):
+    backend.reject = True
+    client.post("/standup/sessions/1", data=dict(FORM, yesterday="draft text"))
+
+    assert wait_for_state(client, 1) == submissions.FAILED
+    page = client.get("/standup/sessions/1").get_data(as_text=True)
+    assert "Failed to submit response" in page
+    assert "draft text" in page
+
+    backend.reject = False
+    client.post("/standup/sessions/1", data=FORM)
+    assert wait_for_state(client, 1) == submissions.DONE
+    assert len(backend.posts) == 2
+    assert len(my_rows(stub, 1)) == 1
+
+
+def test_submission_owned_by_another_worker(client, stub, backend, monkeypatch):
+    monkeypatch.setattr(submissions, "SUBMIT_ASYNC", True)
+    monkeypatch.setattr(submissions, "SUBMIT_RECHECK", 0.0)
+    backend.delay = 0.3
+
+    client.post("/standup/sessions/1", data=FORM)
+    # This worker never took it: only the marker in the Flask session is left
+    submissions._records.clear()
+    submissions._responded.clear()
+
+    assert client.get("/standup/sessions/1/submission").json["state"] == submissions.PENDING
+    client.post("/standup/sessions/1", data=FORM)
+    assert wait_for_state(client, 1) == submissions.DONE
+    assert len(backend.posts) == 1
+    assert len(my_rows(stub, 1)) == 1
+
+
+def test_expired_token_is_refreshed_once(client, stub, backend, monkeypatch):
+    # Let the expired token reach the submission, as if it expired while queued
+    monkeypatch.setattr(helpers, "TOKEN_REFRESH_MARGIN", -3600)
+    backend.reject_expired = True
+    with client.session_transaction() as session:
+        session["token"] = make_token(1, lifetime=-10)
+
+    client.post("/standup/sessions/1", data=FORM)
+
+    assert wait_for_state(client, 1) == submissions.DONE
+    assert len(backend.posts) == 2
+    assert len(my_rows(stub, 1)) == 1
+
+
+def test_unreachable_api_is_retried(client, stub, backend, monkeypatch):
+    # Calls about responses can't connect until the fourth attempt to post one
+    attempts = []
+    request = requests.Session.request
+
+    def flaky(self, method, url, *args, **kwargs):
+        if "/responses/" in url and len(attempts) < 3:
+            if method == "post":
+                attempts.append(url)
+            raise requests.exceptions.ConnectionError("Connection refused")
+        return request(self, method, url, *args, **kwargs)
+
+    monkeypatch.setattr(requests.Session, "request", flaky)
+
+    response = client.post("/standup/sessions/1", data=FORM)
+
+    assert response.status_code == 302
+    assert wait_for_state(client, 1) == submissions.DONE
+    assert len(attempts) == 3
+    assert len(backend.posts) == 1
+    assert len(my_rows(stub, 1)) == 1
@@ -0,0 +1,36 @@
+from benchmarks.stub_api import StubData, make_token
+from datetime import datetime
+from iris import summary
+import pytest
+
+
+@pytest.fixture(params=[False, True], ids=["whole_listing", "paginated"])
+def stub(request, make_stub):
+    # The stub lists sessions oldest first
+    return make_stub(StubData(standups=2, sessions=5, responses=2), paginate=request.param)
+
+
+@pytest.fixture(autouse=True)
+def clear_summaries():
+    summary._summaries.clear()
+
+
+def build(app, stub, now):
+    with app.test_request_context():
+        return summary.dashboard_summary(make_token(1), list(stub.data.standups.values()), now=now)
+
+
+def test_latest_session_is_picked_by_date(app, stub):
+    summaries = build(app, stub, datetime(2024, 2, 1))
+
+    assert summaries[1]["session"]["date"] == "2024-01-05T14:30:00"
+    assert summaries[2]["session"]["date"] == "2024-01-05T14:30:00"
+    assert summaries[1]["responded"] == 2
+    assert summaries[1]["expected"] == 3
+    assert summaries[1]["missing"] == ["user1"]
+
+
+def test_sessions_scheduled_ahead_are_skipped(app, stub):
+    summaries = build(app, stub, datetime(2024, 1, 3, 12))
+
+    assert summaries[1]["session"]["date"] == "2024-01-02T14:30:00"
@@ -0,0 +1,38 @@
+from iris import helpers
+from iris.helpers import CircuitBreaker
+import pytest
+
+
+@pytest.fixture(params=["unreachable", "breaker_open"])
+def api_down(request, client, monkeypatch):
+    """Make every API call after login fail, by connection error or an open breaker"""
+    if request.param == "unreachable":
+        monkeypatch.setattr(helpers, "API_URL", "http://127.0.0.1:1")
+    else:
+        monkeypatch.setattr(helpers, "API_BREAKER", True)
+        monkeypatch.setattr(CircuitBreaker, "allow", lambda self: None)
+    return client
+
+
+@pytest.mark.parametrize("path", ["/standup/1", "/standup/sessions/1"])
+def test_page_redirects_when_api_is_down(api_down, path):
+    response = api_down.get(path)
+
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith("/standup/dashboard")
+
+
+@pytest.mark.parametrize("path", ["/standup/1/sessions", "/standup/sessions/1/responses"])
+def test_fragment_is_not_found_when_api_is_down(api_down, path):
+    assert api_down.get(path).status_code == 404
+
+
+def test_cached_listing_is_closed_safely(client, monkeypatch):
+    # The standup is refetched but its sessions come from the cache
+    client.get("/standup/1")
+    monkeypatch.setattr(helpers, "API_URL", "http://127.0.0.1:1")
+    helpers.cache.response_cache.invalidate("/standups/1")
+
+    response = client.get("/standup/1")
+
+    assert response.status_code == 302